@@ -0,0 +1,52 @@
+"""
+Command line tools for SourceChat index snapshots.
+
+Usage (from the backend directory):
+    python -m app.cli export <repo_id> [-o snapshot.scidx.gz]
+    python -m app.cli import <snapshot.scidx.gz> [--repo-id <repo_id>]
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+from app.services.git_service import GitService
+from app.services.snapshot_service import SNAPSHOT_SUFFIX, SnapshotService
+from app.services.storage_service import StorageService
+from dotenv import load_dotenv
+
+
+def get_snapshot_service() -> SnapshotService:
+    git_service = GitService(max_repo_size_mb=int(os.getenv("MAX_REPO_SIZE_MB", "100")))
+    return SnapshotService(storage_service=StorageService(git_service=git_service))
+
+
+def main() -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="SourceChat index snapshots")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export a repository index")
+    export_parser.add_argument("repo_id")
+    export_parser.add_argument("-o", "--output", type=Path)
+
+    import_parser = subparsers.add_parser("import", help="Import a snapshot")
+    import_parser.add_argument("snapshot", type=Path)
+    import_parser.add_argument("--repo-id")
+
+    args = parser.parse_args()
+    snapshot_service = get_snapshot_service()
+
+    if args.command == "export":
+        output = args.output or Path(f"{args.repo_id}{SNAPSHOT_SUFFIX}")
+        result = snapshot_service.export_snapshot(args.repo_id, output)
+    else:
+        result = snapshot_service.import_snapshot(args.snapshot, args.repo_id)
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,43 @@
 # app/routers/api.py
 import os
+import tempfile
+import time
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Union
 
 from app.models.repo import RepoInput
+from app.services.coalescing import SingleFlight
 from app.services.git_service import GitService
 from app.services.rag_service import RAGService
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from app.services.scheduler import (
+    BULK,
+    INTERACTIVE,
+    SchedulerRejected,
+    run_scheduled,
+    scheduler_context,
+)
+from app.services.snapshot_service import SNAPSHOT_SUFFIX, SnapshotService
+from app.services.storage_service import INDEX_ARCHIVED, StorageService
+from app.utils.index_archive import IndexArchiveError
+from app.utils.metrics import metrics
+from app.utils.vector_store import get_collection_name
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
 
 router = APIRouter(prefix="/api/v1", tags=["repositories"])
 
+# Identical questions in flight for the same repository share one answer
+chat_flight = SingleFlight("chat")
+
+# Search pagination and batch limits
+SEARCH_MAX_LIMIT = 100
+SEARCH_MAX_OFFSET = 1000
+SEARCH_MAX_QUERIES = int(os.getenv("SEARCH_MAX_QUERIES", "50"))
+
 
 # Pydantic models for request/response
 class ChatRequest(BaseModel):
@@ -21,6 +48,21 @@ class ChatResponse(BaseModel):
     answer: str
     sources: List[Dict[str, Any]]
     repo_id: str
+    route: str = "chunks"
+
+
+class SearchRequest(BaseModel):
+    query: Optional[str] = None
+    queries: Optional[List[str]] = None
+    file_extension: Union[str, List[str], None] = None
+    path_prefix: Optional[str] = None
+    limit: int = Field(10, ge=1, le=SEARCH_MAX_LIMIT)
+    offset: int = Field(0, ge=0, le=SEARCH_MAX_OFFSET)
+
+
+class SearchResponse(BaseModel):
+    repo_id: str
+    results: List[Dict[str, Any]]
 
 
 def get_git_service() -> GitService:
@@ -29,21 +71,63 @@ def get_git_service() -> GitService:
     return GitService(max_repo_size_mb=max_repo_size_mb)
 
 
+@lru_cache(maxsize=1)
 def get_rag_service() -> RAGService:
-    """Dependency to get RAGService instance."""
+    """
+    Dependency to get the shared RAGService instance.
+
+    The instance is shared so that concurrent requests can batch their
+    query embeddings together.
+    """
     return RAGService()
 
 
+def get_storage_service(
+    git_service: GitService = Depends(get_git_service),
+) -> StorageService:
+    """Dependency to get StorageService instance."""
+    return StorageService(git_service=git_service)
+
+
+def get_snapshot_service(
+    storage_service: StorageService = Depends(get_storage_service),
+) -> SnapshotService:
+    """Dependency to get SnapshotService instance."""
+    return SnapshotService(storage_service=storage_service)
+
+
+def get_client_id(request: Request) -> str:
+    """Identify the caller for per-client fairness in the LLM scheduler."""
+    client_id = request.headers.get("X-Client-ID")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "anonymous"
+
+
+def rejected_exception(e: SchedulerRejected) -> HTTPException:
+    """Translate a shed scheduler call into a 429/503 with Retry-After."""
+    return HTTPException(
+        status_code=e.status_code,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
 @router.post("/repos/clone", response_model=Dict[str, str])
 async def clone_repository(
-    repo_input: RepoInput, git_service: GitService = Depends(get_git_service)
+    repo_input: RepoInput,
+    background_tasks: BackgroundTasks,
+    git_service: GitService = Depends(get_git_service),
+    storage_service: StorageService = Depends(get_storage_service),
 ) -> Dict[str, str]:
     """
     Clone a GitHub repository.
 
     Args:
         repo_input: Repository input containing the GitHub URL
+        background_tasks: Runs budget enforcement after the response
         git_service: GitService dependency for cloning operations
+        storage_service: StorageService dependency for disk quota tracking
 
     Returns:
         Dictionary containing the repository ID and status
@@ -53,7 +137,15 @@ async def clone_repository(
                       or repository exceeds size limits
     """
     try:
-        repo_id = git_service.clone_repository(str(repo_input.url))
+        repo_url = str(repo_input.url)
+        repo_id = git_service.clone_repository(repo_url)
+        await run_in_threadpool(
+            storage_service.register_clone,
+            repo_id,
+            repo_url,
+            git_service.get_head_commit(repo_id),
+        )
+        background_tasks.add_task(storage_service.enforce_budget, protect={repo_id})
         return {
             "repo_id": repo_id,
             "status": "cloned",
@@ -70,14 +162,27 @@ async def clone_repository(
 
 @router.post("/repos/{repo_id}/process", response_model=Dict[str, Any])
 async def process_repository(
-    repo_id: str, rag_service: RAGService = Depends(get_rag_service)
+    repo_id: str,
+    background_tasks: BackgroundTasks,
+    summaries: bool = False,
+    client_id: str = Depends(get_client_id),
+    rag_service: RAGService = Depends(get_rag_service),
+    storage_service: StorageService = Depends(get_storage_service),
 ) -> Dict[str, Any]:
     """
     Process a cloned repository for RAG (create embeddings).
 
+    Evicted working trees are re-cloned before processing. Embedding and
+    summary calls are scheduled at bulk priority, behind interactive chat.
+
     Args:
         repo_id: The repository identifier
+        background_tasks: Runs budget enforcement after the response
+        summaries: Also build the hierarchical summary index used to answer
+                   broad architecture questions
+        client_id: Caller identity used for scheduler fairness
         rag_service: RAGService dependency for processing
+        storage_service: StorageService dependency for tiered storage
 
     Returns:
         Dictionary containing processing status and statistics
@@ -86,8 +191,19 @@ async def process_repository(
         HTTPException: If repository is not found or processing fails
     """
     try:
-        result = rag_service.process_repository(repo_id)
+        await run_in_threadpool(storage_service.ensure_working_tree, repo_id)
+        with scheduler_context(BULK, client_id):
+            result = await run_scheduled(
+                rag_service.process_repository, repo_id, build_summaries=summaries
+            )
+        if result["status"] == "processed":
+            await run_in_threadpool(storage_service.record_index, repo_id)
+            background_tasks.add_task(storage_service.enforce_budget, protect={repo_id})
         return result
+    except HTTPException:
+        raise
+    except SchedulerRejected as e:
+        raise rejected_exception(e)
     except FileNotFoundError:
         raise HTTPException(
             status_code=404, detail=f"Repository with ID '{repo_id}' not found"
@@ -98,19 +214,75 @@ async def process_repository(
         )
 
 
+@router.post("/repos/{repo_id}/summaries", response_model=Dict[str, Any])
+async def build_repository_summaries(
+    repo_id: str,
+    client_id: str = Depends(get_client_id),
+    rag_service: RAGService = Depends(get_rag_service),
+    storage_service: StorageService = Depends(get_storage_service),
+) -> Dict[str, Any]:
+    """
+    Build or incrementally update the hierarchical summary index.
+
+    Only files that changed since the last build, and their ancestor
+    directories, are summarized again. Summary calls are scheduled at bulk
+    priority.
+
+    Args:
+        repo_id: The repository identifier
+        client_id: Caller identity used for scheduler fairness
+        rag_service: RAGService dependency for summarization
+        storage_service: StorageService dependency for tiered storage
+
+    Returns:
+        Dictionary containing summary counts and how many were recomputed
+
+    Raises:
+        HTTPException: If repository is not found or summarization fails
+    """
+    try:
+        await run_in_threadpool(storage_service.ensure_working_tree, repo_id)
+        with scheduler_context(BULK, client_id):
+            return await run_scheduled(rag_service.build_summaries, repo_id)
+    except HTTPException:
+        raise
+    except SchedulerRejected as e:
+        raise rejected_exception(e)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"Repository with ID '{repo_id}' not found"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error summarizing repository: {str(e)}"
+        )
+
+
 @router.post("/repos/{repo_id}/chat", response_model=ChatResponse)
 async def chat_with_repository(
     repo_id: str,
     chat_request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    client_id: str = Depends(get_client_id),
     rag_service: RAGService = Depends(get_rag_service),
+    storage_service: StorageService = Depends(get_storage_service),
 ) -> ChatResponse:
     """
     Chat with a processed repository using RAG.
 
+    Archived (cold) indexes are restored before answering; the query latency
+    is recorded separately for cold and warm starts. Identical questions that
+    are already being answered for the repository share the in-flight result.
+    Model calls are scheduled at interactive priority; when capacity is
+    exhausted the request is rejected with 429/503 and a Retry-After header.
+
     Args:
         repo_id: The repository identifier
         chat_request: The chat request containing the question
+        background_tasks: Runs budget enforcement after the response
+        client_id: Caller identity used for scheduler fairness
         rag_service: RAGService dependency for chat operations
+        storage_service: StorageService dependency for tiered storage
 
     Returns:
         ChatResponse containing the answer and sources
@@ -119,41 +291,240 @@ async def chat_with_repository(
         HTTPException: If repository is not found, not processed, or chat fails
     """
     try:
+        start = time.perf_counter()
+        cold_start = await run_in_threadpool(storage_service.ensure_index, repo_id)
+        if cold_start:
+            background_tasks.add_task(storage_service.enforce_budget, protect={repo_id})
+
         # Check if repository is processed
-        status = rag_service.get_repository_status(repo_id)
+        status = await run_in_threadpool(rag_service.get_repository_status, repo_id)
         if not status["processed"]:
             raise HTTPException(
                 status_code=400,
                 detail=f"Repository '{repo_id}' has not been processed for RAG. Please process it first.",
             )
 
-        result = rag_service.chat_with_repository(repo_id, chat_request.question)
+        question = " ".join(chat_request.question.split())
+        with scheduler_context(INTERACTIVE, client_id):
+            result = await chat_flight.run(
+                (repo_id, question),
+                lambda: run_scheduled(
+                    rag_service.chat_with_repository, repo_id, chat_request.question
+                ),
+            )
+        metrics.observe(
+            "chat_latency_seconds",
+            time.perf_counter() - start,
+            start="cold" if cold_start else "warm",
+        )
         return ChatResponse(**result)
 
     except HTTPException:
         raise
+    except SchedulerRejected as e:
+        raise rejected_exception(e)
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error chatting with repository: {str(e)}"
         )
 
 
+async def run_search(
+    repo_id: str,
+    search_request: SearchRequest,
+    background_tasks: BackgroundTasks,
+    client_id: str,
+    rag_service: RAGService,
+    storage_service: StorageService,
+) -> SearchResponse:
+    """Validate a search request and run it against the repository index."""
+    if search_request.query is not None and search_request.queries is not None:
+        raise HTTPException(
+            status_code=400, detail="Provide either 'query' or 'queries', not both"
+        )
+    queries = (
+        [search_request.query]
+        if search_request.query is not None
+        else search_request.queries or []
+    )
+    queries = [" ".join(query.split()) for query in queries]
+    if not queries or not all(queries):
+        raise HTTPException(status_code=400, detail="Search queries must not be empty")
+    if len(queries) > SEARCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {SEARCH_MAX_QUERIES} queries can be searched at once",
+        )
+
+    file_extensions = search_request.file_extension
+    if isinstance(file_extensions, str):
+        file_extensions = [file_extensions]
+
+    try:
+        cold_start = await run_in_threadpool(storage_service.ensure_index, repo_id)
+        if cold_start:
+            background_tasks.add_task(storage_service.enforce_budget, protect={repo_id})
+
+        status = await run_in_threadpool(rag_service.get_repository_status, repo_id)
+        if not status["processed"]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Repository '{repo_id}' has not been processed for RAG. Please process it first.",
+            )
+
+        start = time.perf_counter()
+        with scheduler_context(INTERACTIVE, client_id):
+            results = await run_scheduled(
+                rag_service.search,
+                repo_id,
+                queries,
+                limit=search_request.limit,
+                offset=search_request.offset,
+                file_extensions=file_extensions,
+                path_prefix=search_request.path_prefix,
+            )
+        metrics.observe(
+            "search_latency_seconds",
+            time.perf_counter() - start,
+            mode="batch" if len(queries) > 1 else "single",
+        )
+        return SearchResponse(repo_id=repo_id, results=results)
+
+    except HTTPException:
+        raise
+    except SchedulerRejected as e:
+        raise rejected_exception(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error searching repository: {str(e)}"
+        )
+
+
+@router.get("/repos/{repo_id}/search", response_model=SearchResponse)
+async def search_repository(
+    repo_id: str,
+    query: str,
+    background_tasks: BackgroundTasks,
+    file_extension: Optional[List[str]] = Query(None),
+    path_prefix: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+    client_id: str = Depends(get_client_id),
+    rag_service: RAGService = Depends(get_rag_service),
+    storage_service: StorageService = Depends(get_storage_service),
+) -> SearchResponse:
+    """
+    Retrieve the chunks that best match a query, without calling the LLM.
+
+    Args:
+        repo_id: The repository identifier
+        query: The search query
+        background_tasks: Runs budget enforcement after the response
+        file_extension: Only return chunks from files with these extensions
+        path_prefix: Only return chunks under this directory (or file) path
+        limit: Page size
+        offset: Number of ranked chunks to skip
+        client_id: Caller identity used for scheduler fairness
+        rag_service: RAGService dependency for retrieval
+        storage_service: StorageService dependency for tiered storage
+
+    Returns:
+        SearchResponse with one page of ranked chunks, including file paths
+        and line ranges
+
+    Raises:
+        HTTPException: If repository is not processed or search fails
+    """
+    search_request = SearchRequest(
+        query=query,
+        file_extension=file_extension,
+        path_prefix=path_prefix,
+        limit=limit,
+        offset=offset,
+    )
+    return await run_search(
+        repo_id,
+        search_request,
+        background_tasks,
+        client_id,
+        rag_service,
+        storage_service,
+    )
+
+
+@router.post("/repos/{repo_id}/search", response_model=SearchResponse)
+async def search_repository_batch(
+    repo_id: str,
+    search_request: SearchRequest,
+    background_tasks: BackgroundTasks,
+    client_id: str = Depends(get_client_id),
+    rag_service: RAGService = Depends(get_rag_service),
+    storage_service: StorageService = Depends(get_storage_service),
+) -> SearchResponse:
+    """
+    Retrieve ranked chunks for a single query or a batch of queries.
+
+    A batch (``queries``) is embedded in one upstream call and answered by
+    one index query; filters and pagination apply to every query.
+
+    Args:
+        repo_id: The repository identifier
+        search_request: The query (or queries), filters and pagination
+        background_tasks: Runs budget enforcement after the response
+        client_id: Caller identity used for scheduler fairness
+        rag_service: RAGService dependency for retrieval
+        storage_service: StorageService dependency for tiered storage
+
+    Returns:
+        SearchResponse with one page of ranked chunks per query
+
+    Raises:
+        HTTPException: If the request is invalid, the repository is not
+                      processed or search fails
+    """
+    return await run_search(
+        repo_id,
+        search_request,
+        background_tasks,
+        client_id,
+        rag_service,
+        storage_service,
+    )
+
+
 @router.get("/repos/{repo_id}/status", response_model=Dict[str, Any])
 async def get_repository_status(
-    repo_id: str, rag_service: RAGService = Depends(get_rag_service)
+    repo_id: str,
+    rag_service: RAGService = Depends(get_rag_service),
+    storage_service: StorageService = Depends(get_storage_service),
 ) -> Dict[str, Any]:
     """
     Get the processing status of a repository.
 
+    Archived (cold) indexes are reported as processed, since they are
+    restored transparently on the next chat or search; ``tier`` tells which
+    storage tier the repository is in.
+
     Args:
         repo_id: The repository identifier
         rag_service: RAGService dependency
+        storage_service: StorageService dependency for tiered storage
 
     Returns:
         Dictionary containing processing status and metadata
     """
     try:
-        rag_status = rag_service.get_repository_status(repo_id)
+        storage = await run_in_threadpool(storage_service.get_tier, repo_id)
+        if storage and storage["index"] == INDEX_ARCHIVED:
+            rag_status = {
+                "processed": True,
+                "chunk_count": storage["archived_chunk_count"],
+                "collection_name": get_collection_name(repo_id),
+            }
+        else:
+            rag_status = rag_service.get_repository_status(repo_id)
+        if storage:
+            rag_status["tier"] = storage["tier"]
 
         # Also get basic repo info
         repo_path = Path("repos") / repo_id
@@ -179,43 +550,66 @@ async def get_repository_status(
 
 
 @router.get("/repos", response_model=List[Dict[str, Any]])
-async def list_repositories() -> List[Dict[str, Any]]:
+async def list_repositories(
+    storage_service: StorageService = Depends(get_storage_service),
+) -> List[Dict[str, Any]]:
     """
     List all cloned repositories.
 
+    Repositories whose working tree was evicted (or that were imported from
+    a snapshot) are listed from the storage manifest with ``exists`` false.
+
+    Args:
+        storage_service: StorageService dependency for tiered storage
+
     Returns:
         List of dictionaries containing repository information including
         repo_id, path, and basic metadata
     """
     repos_dir = Path("repos")
     repositories = []
-
-    if not repos_dir.exists():
-        return repositories
-
-    for repo_path in repos_dir.iterdir():
-        if repo_path.is_dir():
-            repo_size = sum(f.stat().st_size for f in repo_path.rglob("*")) / (
-                1024 * 1024
-            )
-            repositories.append(
-                {
+    usage = await run_in_threadpool(storage_service.get_usage)
+    tiers = {repo["repo_id"]: repo["tier"] for repo in usage["repositories"]}
+
+    if repos_dir.exists():
+        for repo_path in repos_dir.iterdir():
+            if repo_path.is_dir():
+                repo_size = sum(f.stat().st_size for f in repo_path.rglob("*")) / (
+                    1024 * 1024
+                )
+                repository = {
                     "repo_id": repo_path.name,
                     "path": str(repo_path),
                     "size_mb": round(repo_size, 2),
                 }
-            )
+                if repo_path.name in tiers:
+                    repository["tier"] = tiers.pop(repo_path.name)
+                repositories.append(repository)
+
+    for repo_id, tier in tiers.items():
+        repositories.append(
+            {
+                "repo_id": repo_id,
+                "path": str(repos_dir / repo_id),
+                "size_mb": 0,
+                "exists": False,
+                "tier": tier,
+            }
+        )
 
     return repositories
 
 
 @router.get("/repos/{repo_id}", response_model=Dict[str, Any])
-async def get_repository_info(repo_id: str) -> Dict[str, Any]:
+async def get_repository_info(
+    repo_id: str, storage_service: StorageService = Depends(get_storage_service)
+) -> Dict[str, Any]:
     """
     Get information about a specific cloned repository.
 
     Args:
         repo_id: The repository identifier
+        storage_service: StorageService dependency for tiered storage
 
     Returns:
         Dictionary containing detailed repository information
@@ -224,31 +618,48 @@ async def get_repository_info(repo_id: str) -> Dict[str, Any]:
         HTTPException: If repository is not found
     """
     repo_path = Path("repos") / repo_id
+    storage = await run_in_threadpool(storage_service.get_tier, repo_id)
 
     if not repo_path.exists():
-        raise HTTPException(
-            status_code=404, detail=f"Repository with ID '{repo_id}' not found"
-        )
+        if not storage:
+            raise HTTPException(
+                status_code=404, detail=f"Repository with ID '{repo_id}' not found"
+            )
+        # Evicted working trees are re-cloned on demand
+        return {
+            "repo_id": repo_id,
+            "path": str(repo_path),
+            "size_mb": 0,
+            "file_count": 0,
+            "exists": False,
+            "tier": storage["tier"],
+        }
 
     repo_size = sum(f.stat().st_size for f in repo_path.rglob("*")) / (1024 * 1024)
     file_count = len(list(repo_path.rglob("*")))
 
-    return {
+    info = {
         "repo_id": repo_id,
         "path": str(repo_path),
         "size_mb": round(repo_size, 2),
         "file_count": file_count,
         "exists": True,
     }
+    if storage:
+        info["tier"] = storage["tier"]
+    return info
 
 
 @router.delete("/repos/{repo_id}", response_model=Dict[str, str])
-async def delete_repository(repo_id: str) -> Dict[str, str]:
+async def delete_repository(
+    repo_id: str, storage_service: StorageService = Depends(get_storage_service)
+) -> Dict[str, str]:
     """
-    Delete a cloned repository.
+    Delete a cloned repository, its vector collection and any archived index.
 
     Args:
         repo_id: The repository identifier to delete
+        storage_service: StorageService dependency for tiered storage
 
     Returns:
         Dictionary containing deletion status
@@ -257,16 +668,13 @@ async def delete_repository(repo_id: str) -> Dict[str, str]:
         HTTPException: If repository is not found or deletion fails
     """
     repo_path = Path("repos") / repo_id
-
-    if not repo_path.exists():
+    if not repo_path.exists() and not storage_service.is_tracked(repo_id):
         raise HTTPException(
             status_code=404, detail=f"Repository with ID '{repo_id}' not found"
         )
 
     try:
-        import shutil
-
-        shutil.rmtree(repo_path)
+        await run_in_threadpool(storage_service.remove, repo_id)
         return {
             "repo_id": repo_id,
             "status": "deleted",
@@ -277,3 +685,133 @@ async def delete_repository(repo_id: str) -> Dict[str, str]:
             status_code=500, detail=f"Failed to delete repository: {str(e)}"
         )
 
+
+@router.get("/repos/{repo_id}/snapshot", response_class=FileResponse)
+async def export_snapshot(
+    repo_id: str, snapshot_service: SnapshotService = Depends(get_snapshot_service)
+) -> FileResponse:
+    """
+    Export a processed repository's index as a portable snapshot file.
+
+    Args:
+        repo_id: The repository identifier
+        snapshot_service: SnapshotService dependency for export
+
+    Returns:
+        Compressed snapshot containing chunks, metadata and embeddings
+
+    Raises:
+        HTTPException: If the repository has not been processed or export fails
+    """
+    fd, tmp_name = tempfile.mkstemp(suffix=SNAPSHOT_SUFFIX)
+    os.close(fd)
+    try:
+        await run_in_threadpool(
+            snapshot_service.export_snapshot, repo_id, Path(tmp_name)
+        )
+    except FileNotFoundError:
+        os.unlink(tmp_name)
+        raise HTTPException(
+            status_code=404,
+            detail=f"Repository '{repo_id}' has not been processed for RAG",
+        )
+    except Exception as e:
+        os.unlink(tmp_name)
+        raise HTTPException(
+            status_code=500, detail=f"Error exporting snapshot: {str(e)}"
+        )
+
+    return FileResponse(
+        tmp_name,
+        media_type="application/gzip",
+        filename=f"{repo_id}{SNAPSHOT_SUFFIX}",
+        background=BackgroundTask(os.unlink, tmp_name),
+    )
+
+
+@router.post("/repos/{repo_id}/snapshot", response_model=Dict[str, Any])
+async def import_snapshot(
+    repo_id: str,
+    request: Request,
+    snapshot_service: SnapshotService = Depends(get_snapshot_service),
+) -> Dict[str, Any]:
+    """
+    Import a snapshot (raw request body) as the index of a repository.
+
+    The body is streamed to a spooled temporary file and bulk-loaded into
+    the vector store without calling the embedding API.
+
+    Args:
+        repo_id: The repository identifier to import as
+        request: Request whose body is the snapshot file
+        snapshot_service: SnapshotService dependency for import
+
+    Returns:
+        Dictionary containing import status and statistics
+
+    Raises:
+        HTTPException: If the snapshot is invalid or import fails
+    """
+    with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+
+        try:
+            return await run_in_threadpool(
+                snapshot_service.import_snapshot, spool, repo_id
+            )
+        except (IndexArchiveError, OSError, EOFError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid snapshot: {str(e)}")
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Error importing snapshot: {str(e)}"
+            )
+
+
+@router.get("/storage", response_model=Dict[str, Any], tags=["storage"])
+async def get_storage_usage(
+    storage_service: StorageService = Depends(get_storage_service),
+) -> Dict[str, Any]:
+    """
+    Get the disk budget, current usage and tier of every tracked repository.
+
+    Args:
+        storage_service: StorageService dependency for tiered storage
+
+    Returns:
+        Dictionary containing budget, usage and per-repository tiers
+    """
+    return await run_in_threadpool(storage_service.get_usage)
+
+
+@router.post("/storage/evict", response_model=List[Dict[str, str]], tags=["storage"])
+async def evict_cold_repositories(
+    storage_service: StorageService = Depends(get_storage_service),
+) -> List[Dict[str, str]]:
+    """
+    Evict cold working trees and collections until usage fits the budget.
+
+    Args:
+        storage_service: StorageService dependency for tiered storage
+
+    Returns:
+        List of eviction actions that were performed
+    """
+    try:
+        return await run_in_threadpool(storage_service.enforce_budget)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error evicting repositories: {str(e)}"
+        )
+
+
+@router.get("/metrics", response_model=Dict[str, Any], tags=["metrics"])
+async def get_metrics() -> Dict[str, Any]:
+    """
+    Get in-process service metrics.
+
+    Returns:
+        Dictionary of counters, gauges and latency summaries
+    """
+    return metrics.snapshot()
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+from app.utils.metrics import metrics
+
+
+class SingleFlight:
+    """
+    Deduplicate identical in-flight async calls.
+
+    While a call for a key is running, further callers with the same key wait
+    for and share its result instead of starting their own computation.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            metrics.increment("requests_coalesced_total", flight=self.name)
+
+        # Shield so one cancelled caller does not cancel the shared work
+        return await asyncio.shield(task)
+
+
+class MicroBatchingEmbeddings:
+    """
+    Embeddings wrapper that merges concurrent query embeddings.
+
+    Implements the LangChain ``Embeddings`` interface by duck typing so this
+    module can be imported without loading LangChain.
+
+    Queries arriving within ``max_wait_ms`` of each other are sent upstream
+    as a single ``embed_documents`` call. The first waiting caller acts as
+    the batch leader, so no background thread is needed.
+    """
+
+    def __init__(
+        self, embeddings: Any, max_wait_ms: float = 5, max_batch_size: int = 64
+    ):
+        self.embeddings = embeddings
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[str, Future]] = []
+        self._leader_active = False
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Document embedding is already batched by the caller
+        metrics.increment("embedding_upstream_calls_total", kind="documents")
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((text, future))
+            self._cond.notify_all()
+
+        while not future.done():
+            with self._cond:
+                if future.done():
+                    break
+                if self._leader_active:
+                    self._cond.wait()
+                    continue
+                self._leader_active = True
+            try:
+                self._run_batch()
+            finally:
+                with self._cond:
+                    self._leader_active = False
+                    self._cond.notify_all()
+
+        return future.result()
+
+    def _run_batch(self) -> None:
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+
+        # Identical queries within a batch are embedded once
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        metrics.increment("embedding_upstream_calls_total", kind="query")
+        metrics.observe("embedding_batch_size", len(batch))
+        try:
+            vectors = self.embeddings.embed_documents(unique_texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future in batch:
+            future.set_result(by_text[text])
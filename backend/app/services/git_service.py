@@ -1,5 +1,6 @@
 import shutil
 from pathlib import Path
+from typing import Optional
 
 from fastapi import HTTPException
 from git import Repo
@@ -10,8 +11,21 @@ class GitService:
         self.max_repo_size_mb = max_repo_size_mb
         self.clone_dir_base = Path("repos")
 
-    def clone_repository(self, repo_url: str) -> str:
-        """Clone a GitHub repository and return the repo ID (directory name)."""
+    def clone_repository(
+        self,
+        repo_url: str,
+        commit: Optional[str] = None,
+        repo_id: Optional[str] = None,
+    ) -> str:
+        """
+        Clone a GitHub repository and return the repo ID (directory name).
+
+        When ``commit`` is given the working tree is checked out at that commit,
+        which is used to re-materialize evicted repositories exactly. When
+        ``repo_id`` is given the repository is cloned into that directory
+        instead of the one derived from the URL (e.g. for snapshots imported
+        under another ID).
+        """
         # Validate URL
         if not repo_url.startswith("https://github.com/"):
             raise HTTPException(
@@ -19,7 +33,7 @@ class GitService:
             )
 
         # Generate repo ID (e.g., username_repo)
-        repo_id = repo_url.split("/")[-1].replace(".git", "")
+        repo_id = repo_id or repo_url.split("/")[-1].replace(".git", "")
         clone_path = self.clone_dir_base / repo_id
 
         # Clean up if directory exists
@@ -31,6 +45,8 @@ class GitService:
             clone_path.parent.mkdir(parents=True, exist_ok=True)
             # Clone repository
             Repo.clone_from(repo_url, clone_path)
+            if commit:
+                Repo(clone_path).git.checkout(commit)
 
             # Check repository size
             repo_size_mb = sum(f.stat().st_size for f in clone_path.rglob("*")) / (
@@ -54,3 +70,9 @@ class GitService:
                 status_code=500, detail=f"Failed to clone repository: {str(e)}"
             )
 
+    def get_head_commit(self, repo_id: str) -> Optional[str]:
+        """Return the commit SHA checked out for a cloned repository, if any."""
+        try:
+            return Repo(self.clone_dir_base / repo_id).head.commit.hexsha
+        except Exception:
+            return None
@@ -1,17 +1,52 @@
 import os
 from pathlib import Path
-from typing import Any, Dict
-
+from typing import Any, Dict, List, Optional
+
+from app.services.coalescing import MicroBatchingEmbeddings
+from app.services.scheduler import (
+    ScheduledEmbeddings,
+    SchedulerRejected,
+    estimate_tokens,
+    get_scheduler,
+)
+from app.services.storage_service import _repo_lock
+from app.services.summary_service import (
+    SUMMARY_ANSWER_PROMPT,
+    SummaryService,
+    route_question,
+)
 from app.utils.file_processor import FileProcessor
-from langchain.chains import RetrievalQA
-from langchain.docstore.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from app.utils.metrics import metrics
+from app.utils.vector_store import (
+    build_metadata_filter,
+    directory_metadata,
+    get_collection_name,
+    get_index_id,
+    open_vectorstore,
+    replace_collection,
+)
+
+# Chunking parameters, recorded in index snapshots so imported indexes can be
+# checked for compatibility
+CHUNKING_PARAMS: Dict[str, Any] = {
+    "chunk_size": 2000,
+    "chunk_overlap": 200,
+    "separators": ["\n\n", "\n", ""],
+}
+
+
+def get_embedding_model() -> str:
+    """Return the configured OpenAI embedding model name."""
+    return os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
 
 
 class RAGService:
     def __init__(self):
+        # The LangChain/OpenAI stacks are imported here rather than at module
+        # level so that importing the API does not pay for them at startup.
+        from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         if not self.openai_api_key:
             raise ValueError("OpenAI API key not found, check the environment variables.")
@@ -20,23 +55,46 @@ class RAGService:
         if not self.openai_model:
             raise ValueError("OpenAI model not found, check the environment variables.")
 
-        self.embeddings = OpenAIEmbeddings(api_key=self.openai_api_key)
+        # Every upstream call is admitted through the shared scheduler, and
+        # concurrent query embeddings are merged into one upstream call
+        self.scheduler = get_scheduler()
+        self.embeddings = MicroBatchingEmbeddings(
+            ScheduledEmbeddings(
+                OpenAIEmbeddings(
+                    api_key=self.openai_api_key, model=get_embedding_model()
+                ),
+                self.scheduler,
+            ),
+            max_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5")),
+            max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")),
+        )
         self.llm = ChatOpenAI(
             api_key=self.openai_api_key, model=self.openai_model, temperature=0.1
         )
 
+        # Chunk offsets are kept so every chunk can record its line range
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=2000, chunk_overlap=200, separators=["\n\n", "\n", ""]
+            **CHUNKING_PARAMS, add_start_index=True
         )
 
         self.file_processor = FileProcessor()
+        self.summary_service = SummaryService(
+            self.llm, self.file_processor, self.scheduler
+        )
         self.chroma_persist_dir = Path(
             os.getenv("CHROMA_PERSIST_DIRECTORY", "./chromadb")
         )
         self.chroma_persist_dir.mkdir(exist_ok=True)
 
-    def process_repository(self, repo_id: str) -> Dict[str, Any]:
-        """Process repository files and create embeddings."""
+    def process_repository(
+        self, repo_id: str, build_summaries: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Process repository files and create embeddings.
+
+        With ``build_summaries`` the hierarchical summary index is also built
+        (or incrementally updated) for answering broad questions.
+        """
         repo_path = Path("repos") / repo_id
 
         if not repo_path.exists():
@@ -48,17 +106,24 @@ class RAGService:
         if not files:
             return {"status": "no_processable_files", "file_count": 0}
 
+        from langchain_core.documents import Document
+
         # Create documents from files
         documents = []
+        contents = {}
         for file_path in files:
             try:
                 content = file_path.read_text(encoding="utf-8", errors="ignore")
-                # Create metadata
+                relative_path = str(file_path.relative_to(repo_path))
+                contents[relative_path] = content
+                # Create metadata; the ancestor directories allow path prefix
+                # filters to run inside the index
                 metadata = {
-                    "file_path": str(file_path.relative_to(repo_path)),
+                    "file_path": relative_path,
                     "file_name": file_path.name,
                     "file_extension": file_path.suffix,
                     "repo_id": repo_id,
+                    **directory_metadata(relative_path),
                 }
 
                 doc = Document(page_content=content, metadata=metadata)
@@ -73,36 +138,86 @@ class RAGService:
 
         # Split documents into chunks
         split_docs = self.text_splitter.split_documents(documents)
+        for doc in split_docs:
+            start_index = doc.metadata.pop("start_index", -1)
+            if start_index >= 0:
+                content = contents[doc.metadata["file_path"]]
+                start_line = content.count("\n", 0, start_index) + 1
+                doc.metadata["start_line"] = start_line
+                doc.metadata["end_line"] = start_line + doc.page_content.count("\n")
 
         # Create vector store for this repository
-        collection_name = f"repo_{repo_id}".replace("-", "_").replace(".", "_")
-
-        vectorstore = Chroma(
-            collection_name=collection_name,
+        collection_name = get_collection_name(repo_id)
+
+        # Build a fresh collection and swap it in once every chunk is embedded,
+        # so reprocessing replaces the previous chunks instead of adding to them
+        replace_collection(
+            repo_id,
+            self.chroma_persist_dir,
+            lambda staging: staging.add_documents(split_docs),
             embedding_function=self.embeddings,
-            persist_directory=str(self.chroma_persist_dir),
+            swap_lock=_repo_lock(repo_id),
         )
 
-        # Add documents to vector store
-        vectorstore.add_documents(split_docs)
-
-        return {
+        result = {
             "status": "processed",
             "file_count": len(files),
             "chunk_count": len(split_docs),
             "collection_name": collection_name,
         }
+        if build_summaries:
+            result["summaries"] = self.build_summaries(repo_id)
+        return result
+
+    def build_summaries(self, repo_id: str) -> Dict[str, Any]:
+        """Build or update the hierarchical summary index of a repository."""
+        repo_path = Path("repos") / repo_id
+
+        if not repo_path.exists():
+            raise FileNotFoundError(f"Repository {repo_id} not found")
+
+        return self.summary_service.build_summaries(
+            repo_id, repo_path, index_id=self._index_id(repo_id)
+        )
+
+    def _index_id(self, repo_id: str) -> str:
+        """
+        Return the identity of the repository's current collection.
+
+        Every reprocess or snapshot import builds a new collection, so the
+        identity changes whenever the indexed code does; archiving and
+        restoring a cold index keeps it.
+        """
+        collection = open_vectorstore(repo_id, self.chroma_persist_dir)._collection
+        return get_index_id(collection)
+
+    def has_current_summaries(self, repo_id: str) -> bool:
+        """Return True if summaries exist and match the current index."""
+        return self.summary_service.has_summaries(repo_id, self._index_id(repo_id))
 
     def chat_with_repository(self, repo_id: str, question: str) -> Dict[str, Any]:
-        """Chat with a processed repository."""
-        collection_name = f"repo_{repo_id}".replace("-", "_").replace(".", "_")
+        """
+        Chat with a processed repository.
+
+        Broad questions about the project as a whole are answered from the
+        summary index (when one exists) in a single LLM call; all other
+        questions retrieve leaf chunks from the vector store.
+        """
+        from langchain.chains import RetrievalQA
+
+        # Only broad questions can use summaries, so narrow ones skip loading
+        # the summary index
+        route = route_question(question, True)
+        if route == "summary" and not self.has_current_summaries(repo_id):
+            route = "chunks"
+        metrics.increment("chat_routes_total", route=route)
+        if route == "summary":
+            return self._chat_from_summaries(repo_id, question)
 
         try:
             # Load existing vector store
-            vectorstore = Chroma(
-                collection_name=collection_name,
-                embedding_function=self.embeddings,
-                persist_directory=str(self.chroma_persist_dir),
+            vectorstore = open_vectorstore(
+                repo_id, self.chroma_persist_dir, self.embeddings
             )
 
             # Create retrieval chain
@@ -123,8 +238,15 @@ class RAGService:
             Please include relevant code snippets and file references in your answer.
             """
 
-            # Get response
-            result = qa_chain.invoke({"query": enhanced_question})
+            # Get response, admitted as one call covering the query embedding
+            # and the LLM call over the retrieved chunks
+            tokens = (
+                estimate_tokens(enhanced_question)
+                + 5 * CHUNKING_PARAMS["chunk_size"] // 4
+                + 512
+            )
+            with self.scheduler.admit(tokens, requests=2):
+                result = qa_chain.invoke({"query": enhanced_question})
 
             # Format source documents
             sources = []
@@ -139,20 +261,132 @@ class RAGService:
                     }
                 )
 
-            return {"answer": result["result"], "sources": sources, "repo_id": repo_id}
+            return {
+                "answer": result["result"],
+                "sources": sources,
+                "repo_id": repo_id,
+                "route": route,
+            }
 
+        except SchedulerRejected:
+            raise
         except Exception as e:
             raise Exception(f"Error chatting with repository: {str(e)}")
 
+    def _chat_from_summaries(self, repo_id: str, question: str) -> Dict[str, Any]:
+        """Answer a broad question from the file/directory summary levels."""
+        try:
+            summaries = self.summary_service.get_summary_context(repo_id)
+            context = "\n\n".join(
+                f"{item['kind'].title()} `{item['path']}`:\n{item['summary']}"
+                for item in summaries
+            )
+            prompt = SUMMARY_ANSWER_PROMPT.format(
+                repo_id=repo_id, context=context, question=question
+            )
+            with self.scheduler.admit(estimate_tokens(prompt) + 512):
+                response = self.llm.invoke(prompt)
+
+            sources = [
+                {
+                    "file_path": item["path"],
+                    "file_name": Path(item["path"]).name or item["path"],
+                    "content_preview": item["summary"][:200] + "..."
+                    if len(item["summary"]) > 200
+                    else item["summary"],
+                }
+                for item in summaries
+            ]
+
+            return {
+                "answer": response.content,
+                "sources": sources,
+                "repo_id": repo_id,
+                "route": "summary",
+            }
+
+        except SchedulerRejected:
+            raise
+        except Exception as e:
+            raise Exception(f"Error chatting with repository: {str(e)}")
+
+    def search(
+        self,
+        repo_id: str,
+        queries: List[str],
+        limit: int = 10,
+        offset: int = 0,
+        file_extensions: Optional[List[str]] = None,
+        path_prefix: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve ranked chunks for one or more queries without calling the LLM.
+
+        All queries are embedded in a single upstream call and answered by one
+        vector store query. Metadata filters are applied inside the index, so
+        every page is filled with matching chunks.
+
+        Returns:
+            One result page per query, in the order of ``queries``
+        """
+        # Embed under an admission, like chat: a call leading a micro-batch
+        # must never queue for a slot held by the admitted callers it serves
+        tokens = sum(estimate_tokens(query) for query in queries)
+        with self.scheduler.admit(tokens):
+            if len(queries) == 1:
+                # Single queries go through the micro-batcher
+                query_embeddings = [self.embeddings.embed_query(queries[0])]
+            else:
+                query_embeddings = self.embeddings.embed_documents(queries)
+
+        collection = open_vectorstore(repo_id, self.chroma_persist_dir)._collection
+        # Fetch one extra hit to tell whether another page exists
+        response = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=offset + limit + 1,
+            where=build_metadata_filter(file_extensions, path_prefix),
+            include=["documents", "metadatas", "distances"],
+        )
+
+        results = []
+        for query, documents, metadatas, distances in zip(
+            queries,
+            response["documents"],
+            response["metadatas"],
+            response["distances"],
+        ):
+            hits = [
+                {
+                    "rank": rank,
+                    "file_path": metadata.get("file_path", "unknown"),
+                    "file_name": metadata.get("file_name", "unknown"),
+                    "start_line": metadata.get("start_line"),
+                    "end_line": metadata.get("end_line"),
+                    "distance": distance,
+                    "content": document,
+                }
+                for rank, (document, metadata, distance) in enumerate(
+                    zip(documents, metadatas, distances), start=1
+                )
+            ]
+            results.append(
+                {
+                    "query": query,
+                    "hits": hits[offset : offset + limit],
+                    "offset": offset,
+                    "limit": limit,
+                    "has_more": len(hits) > offset + limit,
+                }
+            )
+        return results
+
     def get_repository_status(self, repo_id: str) -> Dict[str, Any]:
         """Check if a repository has been processed for RAG."""
-        collection_name = f"repo_{repo_id}".replace("-", "_").replace(".", "_")
+        collection_name = get_collection_name(repo_id)
 
         try:
-            vectorstore = Chroma(
-                collection_name=collection_name,
-                embedding_function=self.embeddings,
-                persist_directory=str(self.chroma_persist_dir),
+            vectorstore = open_vectorstore(
+                repo_id, self.chroma_persist_dir, self.embeddings
             )
 
             # Try to get collection info
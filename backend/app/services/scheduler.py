@@ -0,0 +1,386 @@
+import contextvars
+import functools
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, TypeVar
+
+import anyio
+from app.utils.metrics import metrics
+
+T = TypeVar("T")
+
+# Priority classes, highest first
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+# Set by the API layer for the duration of a request
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "scheduler_priority", default=INTERACTIVE
+)
+_client_id: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "scheduler_client_id", default="anonymous"
+)
+# True while the current context holds an admission
+_admitted: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "scheduler_admitted", default=False
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+@contextmanager
+def scheduler_context(priority: str, client_id: str) -> Iterator[None]:
+    """Attribute LLM and embedding calls made within the block to a client."""
+    priority_token = _priority.set(priority)
+    client_token = _client_id.set(client_id)
+    try:
+        yield
+    finally:
+        _client_id.reset(client_token)
+        _priority.reset(priority_token)
+
+
+class SchedulerRejected(Exception):
+    """Raised when a call is shed instead of queued."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"Upstream capacity exceeded ({reason}), retry later")
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``per_minute`` tokens per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def eta(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` tokens are available."""
+        self._refill(now)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def consume(self, amount: float, now: float) -> None:
+        # May go negative, which delays later callers until the debt is repaid
+        self._refill(now)
+        self.tokens -= amount
+
+
+@dataclass
+class _Ticket:
+    priority: str
+    client_id: str
+    tokens: int
+    requests: int
+    deadline: float
+    enqueued: float
+    granted: bool = False
+
+
+class LLMScheduler:
+    """
+    Admission control for embedding and LLM calls.
+
+    Calls are queued per priority class (interactive before bulk) and served
+    round-robin across clients within a class. Dispatch is limited by a
+    concurrency cap and by requests/min and tokens/min token buckets. Calls
+    whose estimated wait exceeds their deadline, or that find their queue
+    full, are rejected immediately with a retry hint instead of waiting.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 8,
+        interactive_reserved: int = 2,
+        max_queue_size: int = 100,
+        timeouts: Optional[Dict[str, float]] = None,
+    ):
+        if max_concurrency < 1 or max_queue_size < 1:
+            raise ValueError("Scheduler concurrency and queue size must be positive")
+
+        self.request_bucket = (
+            TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        )
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        )
+        self.max_concurrency = max_concurrency
+        # Slots bulk work can never take, so chat is not starved by ingestion
+        self.bulk_concurrency = max(1, max_concurrency - interactive_reserved)
+        self.max_queue_size = max_queue_size
+        self.timeouts = timeouts or {INTERACTIVE: 10.0, BULK: 300.0}
+
+        self._cond = threading.Condition()
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Ticket]]"] = {
+            priority: OrderedDict() for priority in PRIORITIES
+        }
+        self._in_flight = {priority: 0 for priority in PRIORITIES}
+
+    @contextmanager
+    def admit(
+        self,
+        tokens: int,
+        requests: int = 1,
+        priority: Optional[str] = None,
+        client_id: Optional[str] = None,
+    ) -> Iterator[None]:
+        """
+        Wait for capacity, then run the block as one admitted call.
+
+        Calls nested inside an admitted block (e.g. the query embedding made
+        by a chat chain) are covered by that block's estimate. They never
+        queue and consume no budget again, so a request can neither deadlock
+        against itself nor be charged twice.
+
+        Raises:
+            SchedulerRejected: If the call is shed
+        """
+        if _admitted.get():
+            yield
+            return
+
+        ticket = self._acquire(
+            tokens, requests, priority or _priority.get(), client_id or _client_id.get()
+        )
+        admitted_token = _admitted.set(True)
+        try:
+            yield
+        finally:
+            _admitted.reset(admitted_token)
+            self._release(ticket)
+
+    def queue_depth(self, priority: str) -> int:
+        with self._cond:
+            return self._depth(priority)
+
+    @property
+    def thread_capacity(self) -> int:
+        """Most threads that can be running or queued in the scheduler at once."""
+        return self.max_concurrency + len(PRIORITIES) * self.max_queue_size
+
+    # Internals (call with the condition held)
+
+    def _depth(self, priority: str) -> int:
+        return sum(len(tickets) for tickets in self._queues[priority].values())
+
+    def _ahead(self, priority: str):
+        """Tickets queued at the same or a higher priority."""
+        for other in PRIORITIES[: PRIORITIES.index(priority) + 1]:
+            for tickets in self._queues[other].values():
+                yield from tickets
+
+    def _budget_eta(self, tokens: float, requests: float, now: float) -> float:
+        eta = 0.0
+        if self.request_bucket:
+            eta = max(eta, self.request_bucket.eta(requests, now))
+        if self.token_bucket:
+            eta = max(eta, self.token_bucket.eta(tokens, now))
+        return eta
+
+    def _clamp(self, tokens: float, requests: float):
+        # Oversized calls are clamped to the bucket size so they can still run
+        if self.token_bucket:
+            tokens = min(tokens, self.token_bucket.capacity)
+        if self.request_bucket:
+            requests = min(requests, self.request_bucket.capacity)
+        return tokens, requests
+
+    def _ticket_budget_eta(self, ticket: _Ticket, now: float) -> float:
+        return self._budget_eta(*self._clamp(ticket.tokens, ticket.requests), now)
+
+    def _consume(self, tokens: float, requests: float, now: float) -> None:
+        if self.request_bucket:
+            self.request_bucket.consume(requests, now)
+        if self.token_bucket:
+            self.token_bucket.consume(tokens, now)
+
+    def _reject(self, priority: str, status_code: int, reason: str, retry_after):
+        metrics.increment(
+            "scheduler_rejections_total", priority=priority, reason=reason
+        )
+        raise SchedulerRejected(status_code, reason, retry_after)
+
+    def _update_gauges(self) -> None:
+        for priority in PRIORITIES:
+            metrics.set_gauge(
+                "scheduler_queue_depth", self._depth(priority), priority=priority
+            )
+            metrics.set_gauge(
+                "scheduler_in_flight", self._in_flight[priority], priority=priority
+            )
+
+    def _next_ticket(self) -> Optional[_Ticket]:
+        for priority in PRIORITIES:
+            if priority == BULK and self._in_flight[BULK] >= self.bulk_concurrency:
+                continue
+            clients = self._queues[priority]
+            if clients:
+                return clients[next(iter(clients))][0]
+        return None
+
+    def _dispatch(self, now: float) -> None:
+        """Grant queued tickets while concurrency and budgets allow."""
+        while sum(self._in_flight.values()) < self.max_concurrency:
+            ticket = self._next_ticket()
+            if ticket is None or self._ticket_budget_eta(ticket, now) > 0:
+                return
+
+            clients = self._queues[ticket.priority]
+            clients[ticket.client_id].popleft()
+            if clients[ticket.client_id]:
+                # Round-robin: the client goes to the back of its class
+                clients.move_to_end(ticket.client_id)
+            else:
+                del clients[ticket.client_id]
+
+            self._consume(ticket.tokens, ticket.requests, now)
+            self._in_flight[ticket.priority] += 1
+            ticket.granted = True
+            self._cond.notify_all()
+
+    def _acquire(
+        self, tokens: int, requests: int, priority: str, client_id: str
+    ) -> _Ticket:
+        now = time.monotonic()
+        timeout = self.timeouts[priority]
+
+        with self._cond:
+            if self._depth(priority) >= self.max_queue_size:
+                self._reject(priority, 503, "queue_full", timeout)
+
+            # Estimated wait for the budget needed by this call and those ahead
+            needed = [self._clamp(tokens, requests)]
+            needed += [self._clamp(t.tokens, t.requests) for t in self._ahead(priority)]
+            eta = self._budget_eta(
+                sum(t for t, _ in needed), sum(r for _, r in needed), now
+            )
+            if eta > timeout:
+                self._reject(priority, 429, "rate_limited", eta)
+
+            ticket = _Ticket(priority, client_id, tokens, requests, now + timeout, now)
+            self._queues[priority].setdefault(client_id, deque()).append(ticket)
+
+            while True:
+                self._dispatch(now)
+                if ticket.granted:
+                    break
+
+                now = time.monotonic()
+                if now >= ticket.deadline:
+                    self._queues[priority][client_id].remove(ticket)
+                    if not self._queues[priority][client_id]:
+                        del self._queues[priority][client_id]
+                    self._update_gauges()
+                    retry_after = self._ticket_budget_eta(ticket, now)
+                    self._reject(priority, 503, "deadline_exceeded", retry_after)
+
+                self._update_gauges()
+                wait = ticket.deadline - now
+                head = self._next_ticket()
+                if head is not None:
+                    budget_wait = self._ticket_budget_eta(head, now)
+                    if budget_wait > 0:
+                        wait = min(wait, budget_wait)
+                self._cond.wait(wait)
+                now = time.monotonic()
+
+            self._update_gauges()
+
+        metrics.observe(
+            "scheduler_wait_seconds",
+            time.monotonic() - ticket.enqueued,
+            priority=priority,
+        )
+        return ticket
+
+    def _release(self, ticket: _Ticket) -> None:
+        with self._cond:
+            self._in_flight[ticket.priority] -= 1
+            self._dispatch(time.monotonic())
+            self._update_gauges()
+            self._cond.notify_all()
+
+
+class ScheduledEmbeddings:
+    """
+    Embeddings wrapper that admits every upstream call through the scheduler.
+
+    Large document lists are split into batches so bulk ingestion is admitted
+    piecewise and interactive traffic can be served in between.
+    """
+
+    def __init__(self, embeddings, scheduler: LLMScheduler, batch_size: int = 100):
+        self.embeddings = embeddings
+        self.scheduler = scheduler
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start : start + self.batch_size]
+            with self.scheduler.admit(sum(estimate_tokens(text) for text in batch)):
+                vectors.extend(self.embeddings.embed_documents(batch))
+        return vectors
+
+    def embed_query(self, text):
+        with self.scheduler.admit(estimate_tokens(text)):
+            return self.embeddings.embed_query(text)
+
+
+@lru_cache(maxsize=1)
+def get_thread_limiter() -> anyio.CapacityLimiter:
+    """
+    Return the worker thread limiter for calls that go through the scheduler.
+
+    Admission blocks a worker thread while it waits, so scheduled work gets
+    its own pool, sized so that every call can reach the scheduler and be
+    queued or shed with a retry hint. It never exhausts the default
+    threadpool used by the other endpoints.
+    """
+    headroom = int(os.getenv("SCHEDULER_THREAD_HEADROOM", "8"))
+    return anyio.CapacityLimiter(get_scheduler().thread_capacity + headroom)
+
+
+async def run_scheduled(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking function that makes scheduled calls in a worker thread."""
+    return await anyio.to_thread.run_sync(
+        functools.partial(func, *args, **kwargs), limiter=get_thread_limiter()
+    )
+
+
+@lru_cache(maxsize=1)
+def get_scheduler() -> LLMScheduler:
+    """Return the process-wide scheduler configured from the environment."""
+    return LLMScheduler(
+        requests_per_minute=float(os.getenv("SCHEDULER_REQUESTS_PER_MINUTE", "0")),
+        tokens_per_minute=float(os.getenv("SCHEDULER_TOKENS_PER_MINUTE", "0")),
+        max_concurrency=int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "8")),
+        interactive_reserved=int(os.getenv("SCHEDULER_INTERACTIVE_RESERVED", "2")),
+        max_queue_size=int(os.getenv("SCHEDULER_MAX_QUEUE_SIZE", "100")),
+        timeouts={
+            INTERACTIVE: float(
+                os.getenv("SCHEDULER_INTERACTIVE_TIMEOUT_SECONDS", "10")
+            ),
+            BULK: float(os.getenv("SCHEDULER_BULK_TIMEOUT_SECONDS", "300")),
+        },
+    )
@@ -0,0 +1,123 @@
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional, Union
+
+from app.services.rag_service import CHUNKING_PARAMS, get_embedding_model
+from app.services.storage_service import StorageService, _repo_lock
+from app.utils.index_archive import (
+    IndexArchiveError,
+    open_index_archive,
+    write_index_archive,
+)
+from app.utils.metrics import metrics
+from app.utils.vector_store import (
+    iter_collection_records,
+    load_archive_batches,
+    open_vectorstore,
+    replace_collection,
+)
+
+SNAPSHOT_SUFFIX = ".scidx.gz"
+
+
+class SnapshotService:
+    """
+    Export and import portable, prebuilt repository indexes.
+
+    A snapshot is an index archive whose header records the source repository,
+    the indexed commit, the chunking parameters and the embedding model. It
+    can be imported on another node to populate the collection without
+    re-cloning or calling the embedding API.
+    """
+
+    def __init__(self, storage_service: StorageService):
+        self.storage_service = storage_service
+        self.chroma_persist_dir = storage_service.chroma_persist_dir
+
+    def export_snapshot(self, repo_id: str, path: Path) -> Dict[str, Any]:
+        """
+        Write a repository's processed index to ``path``.
+
+        Raises:
+            FileNotFoundError: If the repository has no processed index
+        """
+        start = time.perf_counter()
+        self.storage_service.ensure_index(repo_id)
+
+        collection = open_vectorstore(repo_id, self.chroma_persist_dir)._collection
+        if collection.count() == 0:
+            raise FileNotFoundError(f"Repository {repo_id} has not been processed")
+
+        git_service = self.storage_service.git_service
+        entry = self.storage_service.get_entry(repo_id) or {}
+        commit = entry.get("commit") or git_service.get_head_commit(repo_id)
+        header = {
+            "repo_id": repo_id,
+            "repo_url": entry.get("repo_url"),
+            "commit": commit,
+            "chunking": CHUNKING_PARAMS,
+            "embedding_model": get_embedding_model(),
+            "created_at": time.time(),
+        }
+
+        chunk_count = write_index_archive(
+            path, header, iter_collection_records(collection)
+        )
+        metrics.observe("snapshot_seconds", time.perf_counter() - start, op="export")
+
+        return {
+            **header,
+            "chunk_count": chunk_count,
+            "size_bytes": Path(path).stat().st_size,
+        }
+
+    def import_snapshot(
+        self, source: Union[Path, BinaryIO], repo_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Bulk-load a snapshot into the vector store, replacing any existing index.
+
+        The snapshot is loaded into a staging collection first, so a truncated
+        or corrupt snapshot leaves the existing index untouched.
+
+        Args:
+            source: Snapshot file path or binary file object
+            repo_id: Repository ID to import as (defaults to the snapshot's)
+
+        Raises:
+            IndexArchiveError: If the snapshot is malformed or was built with
+                               a different embedding model
+        """
+        start = time.perf_counter()
+        with open_index_archive(source) as reader:
+            header = reader.header
+            embedding_model = get_embedding_model()
+            if header.get("embedding_model") != embedding_model:
+                raise IndexArchiveError(
+                    f"Snapshot was built with embedding model "
+                    f"'{header.get('embedding_model')}', but '{embedding_model}' "
+                    f"is configured"
+                )
+
+            repo_id = repo_id or header["repo_id"]
+            # The existing index stays live until the snapshot is fully read
+            chunk_count = replace_collection(
+                repo_id,
+                self.chroma_persist_dir,
+                lambda staging: load_archive_batches(staging._collection, reader),
+                swap_lock=_repo_lock(repo_id),
+            )
+
+        self.storage_service.record_index(
+            repo_id, repo_url=header.get("repo_url"), commit=header.get("commit")
+        )
+        metrics.observe("snapshot_seconds", time.perf_counter() - start, op="import")
+
+        return {
+            "repo_id": repo_id,
+            "status": "imported",
+            "chunk_count": chunk_count,
+            "commit": header.get("commit"),
+            "chunking": header.get("chunking"),
+            "format_version": header["format_version"],
+        }
@@ -0,0 +1,513 @@
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.services.git_service import GitService
+from app.utils.index_archive import open_index_archive, write_index_archive
+from app.utils.metrics import metrics
+from app.utils.vector_store import (
+    collection_disk_bytes,
+    get_collection_name,
+    get_index_id,
+    iter_collection_records,
+    load_archive_batches,
+    open_vectorstore,
+    replace_collection,
+)
+
+# Tree states
+TREE_PRESENT = "present"
+TREE_EVICTED = "evicted"
+
+# Index states
+INDEX_NONE = "none"
+INDEX_LIVE = "live"
+INDEX_ARCHIVED = "archived"
+
+# Manifest reads and writes are serialised process-wide, since services are
+# instantiated per request. The lock is only held while the manifest is
+# updated; slow tier transitions (clone, archive, restore) run under a
+# per-repository lock instead so they never block other repositories. It is
+# reentrant so a transition can swap a rebuilt collection in (which takes the
+# repository's lock too, see ``replace_collection``).
+_storage_lock = threading.RLock()
+_repo_locks: Dict[str, threading.RLock] = {}
+# When each repository's last access was last written, per manifest
+_persisted_access: Dict[Tuple[str, str], float] = {}
+
+
+@contextmanager
+def _repo_lock(repo_id: str) -> Iterator[None]:
+    """Serialise tier transitions of a single repository."""
+    with _storage_lock:
+        lock = _repo_locks.setdefault(repo_id, threading.RLock())
+    with lock:
+        yield
+
+
+def _directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+class StorageService:
+    """
+    Tiered storage for cloned working trees and their vector indexes.
+
+    Every repository moves between three tiers:
+
+    * hot: working tree on disk and a live Chroma collection
+    * warm: working tree evicted (re-cloned from git on demand)
+    * cold: collection archived to a compressed file and dropped from Chroma
+
+    When the total footprint exceeds ``STORAGE_BUDGET_MB`` the least recently
+    used working trees are evicted first, then the least recently used
+    collections are archived. Cold repositories are rehydrated transparently
+    the next time they are accessed.
+    """
+
+    def __init__(self, git_service: GitService):
+        self.git_service = git_service
+        self.repos_dir = git_service.clone_dir_base
+        self.chroma_persist_dir = Path(
+            os.getenv("CHROMA_PERSIST_DIRECTORY", "./chromadb")
+        )
+        self.archive_dir = Path(os.getenv("ARCHIVE_DIRECTORY", "./archives"))
+        self.manifest_path = self.archive_dir / "storage_manifest.json"
+        self.summary_dir = Path(os.getenv("SUMMARY_CACHE_DIRECTORY", "./summaries"))
+
+        # A budget of 0 disables eviction
+        self.budget_bytes = int(
+            float(os.getenv("STORAGE_BUDGET_MB", "0")) * 1024 * 1024
+        )
+        # Repositories used more recently than this are never evicted
+        self.min_idle_seconds = float(os.getenv("STORAGE_MIN_IDLE_SECONDS", "300"))
+
+    # Manifest
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"Error reading storage manifest: {e}")
+            return {}
+
+    def _save_manifest(self, manifest: Dict[str, Dict[str, Any]]) -> None:
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.manifest_path)
+
+    def _entry(
+        self, manifest: Dict[str, Dict[str, Any]], repo_id: str
+    ) -> Dict[str, Any]:
+        if repo_id not in manifest:
+            repo_path = self.repos_dir / repo_id
+            manifest[repo_id] = {
+                "repo_url": None,
+                "commit": None,
+                "last_access": time.time(),
+                "tree": TREE_PRESENT if repo_path.exists() else TREE_EVICTED,
+                "tree_bytes": _directory_size(repo_path) if repo_path.exists() else 0,
+                "index": INDEX_NONE,
+                "index_bytes": 0,
+                "archive_bytes": 0,
+                "archive_chunks": 0,
+            }
+        return manifest[repo_id]
+
+    def _archive_path(self, repo_id: str) -> Path:
+        return self.archive_dir / f"{repo_id}.scidx.gz"
+
+    # Access tracking
+
+    def register_clone(
+        self, repo_id: str, repo_url: str, commit: Optional[str] = None
+    ) -> None:
+        """Record a freshly cloned working tree."""
+        tree_bytes = _directory_size(self.repos_dir / repo_id)
+        with _storage_lock:
+            manifest = self._load_manifest()
+            entry = self._entry(manifest, repo_id)
+            entry.update(
+                {
+                    "repo_url": repo_url,
+                    "commit": commit,
+                    "last_access": time.time(),
+                    "tree": TREE_PRESENT,
+                    "tree_bytes": tree_bytes,
+                }
+            )
+            self._save_manifest(manifest)
+
+    def record_index(
+        self,
+        repo_id: str,
+        repo_url: Optional[str] = None,
+        commit: Optional[str] = None,
+    ) -> None:
+        """
+        Record that a repository's collection has been (re)built or imported.
+
+        ``repo_url`` and ``commit`` are given for imported snapshots so the
+        working tree can later be materialized from git on demand.
+        """
+        index_bytes = self._measure_index(repo_id)
+        with _storage_lock:
+            manifest = self._load_manifest()
+            entry = self._entry(manifest, repo_id)
+            # A rebuilt collection supersedes any archived copy
+            archive_path = self._archive_path(repo_id)
+            if archive_path.exists():
+                archive_path.unlink()
+            if repo_url:
+                entry["repo_url"] = repo_url
+            if commit:
+                entry["commit"] = commit
+            entry.update(
+                {
+                    "last_access": time.time(),
+                    "index": INDEX_LIVE,
+                    "index_bytes": index_bytes,
+                    "archive_bytes": 0,
+                    "archive_chunks": 0,
+                }
+            )
+            self._save_manifest(manifest)
+
+    def touch(self, repo_id: str) -> None:
+        """
+        Mark a tracked repository as recently used.
+
+        Access times only need to be precise relative to the idle threshold,
+        so they are persisted at most every tenth of ``STORAGE_MIN_IDLE_SECONDS``
+        instead of rewriting the manifest on every request.
+        """
+        now = time.time()
+        key = (str(self.manifest_path), repo_id)
+        if now - _persisted_access.get(key, 0.0) < self.min_idle_seconds / 10:
+            return
+        with _storage_lock:
+            manifest = self._load_manifest()
+            if repo_id in manifest:
+                manifest[repo_id]["last_access"] = now
+                self._save_manifest(manifest)
+                _persisted_access[key] = now
+
+    def get_entry(self, repo_id: str) -> Optional[Dict[str, Any]]:
+        """Return the manifest entry of a repository, if it is tracked."""
+        with _storage_lock:
+            return self._load_manifest().get(repo_id)
+
+    def get_tier(self, repo_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the storage tier of a tracked repository.
+
+        An archived index is not visible in Chroma until it is restored, so
+        its chunk count is taken from the manifest.
+        """
+        entry = self.get_entry(repo_id)
+        if not entry:
+            return None
+        return {
+            "tier": self._tier(entry),
+            "tree": entry["tree"],
+            "index": entry["index"],
+            "archived_chunk_count": entry.get("archive_chunks", 0),
+        }
+
+    def is_tracked(self, repo_id: str) -> bool:
+        """Return True if the repository has any tier recorded in the manifest."""
+        with _storage_lock:
+            return repo_id in self._load_manifest()
+
+    # Rehydration
+
+    def ensure_working_tree(self, repo_id: str) -> bool:
+        """
+        Make sure the working tree exists, re-cloning it if it was evicted.
+
+        Returns:
+            True if the tree had to be re-materialized from git
+        """
+        repo_path = self.repos_dir / repo_id
+        if repo_path.exists():
+            self.touch(repo_id)
+            return False
+
+        with _repo_lock(repo_id):
+            entry = self.get_entry(repo_id)
+            # Another request may have re-cloned it while this one waited
+            if repo_path.exists() or not entry or not entry.get("repo_url"):
+                return False
+            repo_url, commit = entry["repo_url"], entry.get("commit")
+
+            start = time.perf_counter()
+            cloned_id = self.git_service.clone_repository(
+                repo_url, commit, repo_id=repo_id
+            )
+            if cloned_id != repo_id or not repo_path.exists():
+                raise RuntimeError(
+                    f"Re-cloning {repo_url} produced '{cloned_id}' "
+                    f"instead of '{repo_id}'"
+                )
+            metrics.observe(
+                "storage_rehydrate_seconds", time.perf_counter() - start, tier="tree"
+            )
+            metrics.increment("storage_rehydrations_total", tier="tree")
+
+            self._update_entry(
+                repo_id,
+                last_access=time.time(),
+                tree=TREE_PRESENT,
+                tree_bytes=_directory_size(repo_path),
+            )
+            return True
+
+    def ensure_index(self, repo_id: str) -> bool:
+        """
+        Make sure the repository's collection is live, restoring its archive.
+
+        Returns:
+            True if the collection had to be restored from a cold archive
+        """
+        self.touch(repo_id)
+        # Only archived indexes have an archive file, so a live one costs a stat
+        archive_path = self._archive_path(repo_id)
+        if not archive_path.exists():
+            return False
+
+        with _repo_lock(repo_id):
+            entry = self.get_entry(repo_id)
+            if (
+                not entry
+                or entry.get("index") != INDEX_ARCHIVED
+                or not archive_path.exists()
+            ):
+                return False
+
+            start = time.perf_counter()
+            self._restore_index(repo_id, archive_path)
+            archive_path.unlink()
+            metrics.observe(
+                "storage_rehydrate_seconds", time.perf_counter() - start, tier="index"
+            )
+            metrics.increment("storage_rehydrations_total", tier="index")
+
+            self._update_entry(
+                repo_id,
+                index=INDEX_LIVE,
+                index_bytes=self._measure_index(repo_id),
+                archive_bytes=0,
+                archive_chunks=0,
+            )
+            return True
+
+    # Eviction
+
+    def get_usage(self) -> Dict[str, Any]:
+        """Return per-repository footprint and tier information."""
+        with _storage_lock:
+            manifest = self._load_manifest()
+
+        repositories = []
+        total_bytes = 0
+        for repo_id, entry in manifest.items():
+            footprint = self._footprint(entry)
+            total_bytes += footprint
+            repositories.append(
+                {
+                    "repo_id": repo_id,
+                    "tier": self._tier(entry),
+                    "tree": entry["tree"],
+                    "index": entry["index"],
+                    "footprint_mb": round(footprint / (1024 * 1024), 2),
+                    "last_access": entry["last_access"],
+                }
+            )
+
+        return {
+            "budget_mb": round(self.budget_bytes / (1024 * 1024), 2),
+            "used_mb": round(total_bytes / (1024 * 1024), 2),
+            "repositories": repositories,
+        }
+
+    def enforce_budget(
+        self, protect: Optional[Set[str]] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Evict cold data until the footprint fits within the budget.
+
+        Working trees are evicted first since they can be re-cloned cheaply;
+        collections are only archived if that is not enough.
+
+        Args:
+            protect: Repository IDs that must not be evicted (e.g. the one
+                     being served by the current request)
+
+        Returns:
+            List of eviction actions that were performed
+        """
+        if self.budget_bytes <= 0:
+            return []
+
+        protect = protect or set()
+        actions = []
+
+        with _storage_lock:
+            manifest = self._load_manifest()
+            total = sum(self._footprint(entry) for entry in manifest.values())
+            idle_before = time.time() - self.min_idle_seconds
+            candidates = [
+                repo_id
+                for repo_id, entry in sorted(
+                    manifest.items(), key=lambda item: item[1]["last_access"]
+                )
+                if repo_id not in protect and entry["last_access"] <= idle_before
+            ]
+
+        # Each eviction runs under the repository's own lock and re-checks the
+        # entry, since it may have been used while earlier ones were running
+        for repo_id in candidates:
+            if total <= self.budget_bytes:
+                break
+            with _repo_lock(repo_id):
+                entry = self.get_entry(repo_id)
+                if (
+                    not entry
+                    or entry["last_access"] > idle_before
+                    or entry["tree"] != TREE_PRESENT
+                    or not entry.get("repo_url")
+                ):
+                    continue
+                repo_path = self.repos_dir / repo_id
+                if repo_path.exists():
+                    shutil.rmtree(repo_path)
+                total -= entry["tree_bytes"]
+                self._update_entry(repo_id, tree=TREE_EVICTED, tree_bytes=0)
+            actions.append({"repo_id": repo_id, "action": "evicted_tree"})
+            metrics.increment("storage_evictions_total", tier="tree")
+
+        for repo_id in candidates:
+            if total <= self.budget_bytes:
+                break
+            with _repo_lock(repo_id):
+                entry = self.get_entry(repo_id)
+                if (
+                    not entry
+                    or entry["last_access"] > idle_before
+                    or entry["index"] != INDEX_LIVE
+                ):
+                    continue
+                archive_path = self._archive_path(repo_id)
+                try:
+                    archive_chunks = self._archive_index(repo_id, archive_path)
+                except Exception as e:
+                    print(f"Error archiving index for {repo_id}: {e}")
+                    continue
+                archive_bytes = archive_path.stat().st_size
+                total -= entry["index_bytes"] - archive_bytes
+                self._update_entry(
+                    repo_id,
+                    index=INDEX_ARCHIVED,
+                    index_bytes=0,
+                    archive_bytes=archive_bytes,
+                    archive_chunks=archive_chunks,
+                )
+            actions.append({"repo_id": repo_id, "action": "archived_index"})
+            metrics.increment("storage_evictions_total", tier="index")
+
+        metrics.set_gauge("storage_used_bytes", total)
+        return actions
+
+    def remove(self, repo_id: str) -> None:
+        """Delete every tier of a repository: tree, collection, archive, summaries."""
+        with _repo_lock(repo_id):
+            repo_path = self.repos_dir / repo_id
+            if repo_path.exists():
+                shutil.rmtree(repo_path)
+
+            archive_path = self._archive_path(repo_id)
+            if archive_path.exists():
+                archive_path.unlink()
+
+            summary_path = self.summary_dir / f"{repo_id}.json"
+            if summary_path.exists():
+                summary_path.unlink()
+
+            try:
+                open_vectorstore(repo_id, self.chroma_persist_dir).delete_collection()
+            except Exception as e:
+                print(f"Error deleting collection for {repo_id}: {e}")
+
+            with _storage_lock:
+                manifest = self._load_manifest()
+                if manifest.pop(repo_id, None) is not None:
+                    self._save_manifest(manifest)
+
+    # Helpers
+
+    def _update_entry(self, repo_id: str, **fields: Any) -> None:
+        with _storage_lock:
+            manifest = self._load_manifest()
+            if repo_id in manifest:
+                manifest[repo_id].update(fields)
+                self._save_manifest(manifest)
+
+    @staticmethod
+    def _tier(entry: Dict[str, Any]) -> str:
+        if entry["index"] == INDEX_ARCHIVED:
+            return "cold"
+        if entry["tree"] == TREE_EVICTED:
+            return "warm"
+        return "hot"
+
+    @staticmethod
+    def _footprint(entry: Dict[str, Any]) -> int:
+        return entry["tree_bytes"] + entry["index_bytes"] + entry["archive_bytes"]
+
+    def _measure_index(self, repo_id: str) -> int:
+        """Return the on-disk size of the repository's collection."""
+        try:
+            collection = open_vectorstore(repo_id, self.chroma_persist_dir)._collection
+            return collection_disk_bytes(collection, self.chroma_persist_dir)
+        except Exception as e:
+            print(f"Error measuring index for {repo_id}: {e}")
+            return 0
+
+    def _archive_index(self, repo_id: str, archive_path: Path) -> int:
+        vectorstore = open_vectorstore(repo_id, self.chroma_persist_dir)
+        collection = vectorstore._collection
+        header = {
+            "repo_id": repo_id,
+            "collection_name": get_collection_name(repo_id),
+            "collection_metadata": {
+                **(collection.metadata or {}),
+                "index_id": get_index_id(collection),
+            },
+            "created_at": time.time(),
+        }
+        chunk_count = write_index_archive(
+            archive_path, header, iter_collection_records(collection)
+        )
+        vectorstore.delete_collection()
+        return chunk_count
+
+    def _restore_index(self, repo_id: str, archive_path: Path) -> None:
+        with open_index_archive(archive_path) as reader:
+            # Restored through a staging collection like snapshot imports, so
+            # readers never see a partial index; the collection metadata
+            # carries its index_id across the archive
+            replace_collection(
+                repo_id,
+                self.chroma_persist_dir,
+                lambda staging: load_archive_batches(staging._collection, reader),
+                collection_metadata=reader.header.get("collection_metadata"),
+                swap_lock=_repo_lock(repo_id),
+            )
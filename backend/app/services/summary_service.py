@@ -0,0 +1,344 @@
+import contextvars
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.services.scheduler import LLMScheduler, estimate_tokens, get_scheduler
+from app.utils.file_processor import FileProcessor
+from app.utils.metrics import metrics
+
+# Bump when the prompts change so cached summaries are recomputed
+SUMMARY_VERSION = "1"
+
+ROOT = "."
+
+FILE_PROMPT = """Summarize the file `{path}` from the repository '{repo_id}' in 3-5 sentences.
+Describe its purpose, its main classes and functions, and how it relates to the rest of the project.
+
+```
+{content}
+```"""
+
+DIRECTORY_PROMPT = """Summarize the directory `{path}` of the repository '{repo_id}' in 3-5 sentences.
+Describe its role in the project based on the summaries of its contents:
+
+{children}"""
+
+OVERVIEW_PROMPT = """Write an overview of the repository '{repo_id}'.
+Describe its purpose, its architecture and how the top-level parts fit together, based on these summaries:
+
+{children}"""
+
+SUMMARY_ANSWER_PROMPT = """You are analyzing the codebase for repository '{repo_id}'.
+Answer the question using the hierarchical summaries of the repository below.
+Refer to the relevant directories and files in your answer.
+
+{context}
+
+Question: {question}"""
+
+# Questions about the project as a whole rather than specific code. Terms
+# like "structure" or "layout" only count when they refer to the project
+# itself, since they also occur in narrow questions ("what data structure").
+_PROJECT = r"(this|the|its) (project|repo|repository|codebase|code|app|application)"
+_BROAD_QUESTION = re.compile(
+    r"\b("
+    r"architecture|architectural|overview|high[- ]level|big picture|"
+    rf"{_PROJECT} (is )?(structured|organi[sz]ed|laid out)|"
+    rf"(structure|layout|organi[sz]ation) of {_PROJECT}|"
+    r"(project|repo|repository|codebase) (structure|layout|organi[sz]ation)|"
+    r"main (components|modules|parts|pieces)|"
+    r"what (does|is) (this|the) (project|repo|repository|codebase|app|application)|"
+    r"purpose of (this|the) (project|repo|repository|codebase)|"
+    r"(project|repo|repository|codebase) (do|about)"
+    r")\b",
+    re.IGNORECASE,
+)
+
+# References to a specific file or code symbol, which leaf chunks answer best
+_SPECIFIC_REFERENCE = re.compile(
+    r"`[^`]+`|"  # anything in backticks
+    r"\b[\w./-]+\.(py|js|jsx|ts|tsx|java|go|rs|rb|php|cs|c|cpp|h|kt|swift|"
+    r"scala|md|json|ya?ml|toml|html|css|scss|sql|txt)\b|"  # file names
+    r"\b[a-z0-9]+_\w+\b|"  # snake_case identifiers
+    r"\b[A-Z][a-z0-9]+[A-Z]\w*\b|"  # CamelCase identifiers
+    r"\b\w+\(\)"  # calls
+)
+
+
+def route_question(question: str, has_summaries: bool) -> str:
+    """
+    Decide whether a question is answered from summaries or leaf chunks.
+
+    Returns:
+        ``"summary"`` for broad questions that do not name a specific file or
+        symbol, when a summary index exists; otherwise ``"chunks"``
+    """
+    if (
+        has_summaries
+        and _BROAD_QUESTION.search(question)
+        and not _SPECIFIC_REFERENCE.search(question)
+    ):
+        return "summary"
+    return "chunks"
+
+
+def _hash(*parts: str) -> str:
+    digest = hashlib.sha256(SUMMARY_VERSION.encode("utf-8"))
+    for part in parts:
+        digest.update(b"\0" + part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _parent(path: str) -> str:
+    return path.rsplit("/", 1)[0] if "/" in path else ROOT
+
+
+def _depth(path: str) -> int:
+    return 0 if path == ROOT else path.count("/") + 1
+
+
+class SummaryService:
+    """
+    Hierarchical summary index of a repository.
+
+    Files are summarized first, then directories from the deepest level up,
+    and finally the repository root as an overview. Every node is keyed by a
+    content hash (for directories, the hashes of their children), so a
+    rebuild only recomputes the summaries of changed files and their
+    ancestor directories.
+
+    The index records the identity of the vector index it was built against,
+    so summaries left over from before a reprocess or snapshot import are not
+    used to answer questions.
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        file_processor: Optional[FileProcessor] = None,
+        scheduler: Optional[LLMScheduler] = None,
+    ):
+        self.llm = llm
+        self.file_processor = file_processor or FileProcessor()
+        self.scheduler = scheduler or get_scheduler()
+        self.summary_dir = Path(os.getenv("SUMMARY_CACHE_DIRECTORY", "./summaries"))
+        self.max_concurrency = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+        self.max_file_chars = int(os.getenv("SUMMARY_MAX_FILE_CHARS", "12000"))
+        self.max_context_chars = int(os.getenv("SUMMARY_MAX_CONTEXT_CHARS", "12000"))
+
+    def _index_path(self, repo_id: str) -> Path:
+        return self.summary_dir / f"{repo_id}.json"
+
+    def _load_index(self, repo_id: str) -> Dict[str, Any]:
+        index_path = self._index_path(repo_id)
+        if not index_path.exists():
+            return {}
+        try:
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+            if not isinstance(index.get("nodes"), dict):
+                raise ValueError("missing summary nodes")
+            return index
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Error reading summaries for {repo_id}: {e}")
+            return {}
+
+    def load_summaries(self, repo_id: str) -> Dict[str, Dict[str, Any]]:
+        """Return the summary nodes of a repository keyed by path."""
+        return self._load_index(repo_id).get("nodes", {})
+
+    def has_summaries(self, repo_id: str, index_id: Optional[str] = None) -> bool:
+        """
+        Return True if a complete summary index exists for the repository.
+
+        With ``index_id`` the summaries must also have been built against that
+        vector index, so stale summaries are ignored.
+        """
+        index = self._load_index(repo_id)
+        if ROOT not in index.get("nodes", {}):
+            return False
+        return index_id is None or index.get("index_id") == index_id
+
+    def _save_summaries(
+        self,
+        repo_id: str,
+        nodes: Dict[str, Dict[str, Any]],
+        index_id: Optional[str] = None,
+    ) -> None:
+        self.summary_dir.mkdir(parents=True, exist_ok=True)
+        complete = {path: node for path, node in nodes.items() if node["summary"]}
+        index_path = self._index_path(repo_id)
+        tmp_path = index_path.with_name(index_path.name + ".tmp")
+        tmp_path.write_text(
+            json.dumps({"index_id": index_id, "nodes": complete}), encoding="utf-8"
+        )
+        os.replace(tmp_path, index_path)
+
+    def _summarize(self, prompt: str) -> str:
+        # Allow for the summary the model writes back
+        with self.scheduler.admit(estimate_tokens(prompt) + 256):
+            response = self.llm.invoke(prompt)
+        metrics.increment("summary_llm_calls_total")
+        return str(getattr(response, "content", response)).strip()
+
+    def _run_jobs(self, jobs: List[Tuple[str, Callable[[], str]]], nodes) -> None:
+        """Compute summaries for ``(path, job)`` pairs with bounded concurrency."""
+        if not jobs:
+            return
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            # Run each job in a copy of the caller's context so the
+            # scheduler priority and client apply to the worker threads
+            futures = [
+                (path, pool.submit(contextvars.copy_context().run, job))
+                for path, job in jobs
+            ]
+        # Keep every successful summary before reporting the first failure,
+        # so a failed build can be resumed without redoing finished work
+        error = None
+        for path, future in futures:
+            try:
+                nodes[path]["summary"] = future.result()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+    def _children_text(self, children: List[str], nodes) -> str:
+        lines = [
+            f"- `{child}` ({nodes[child]['kind']}): {nodes[child]['summary']}"
+            for child in children
+        ]
+        return "\n".join(lines)[: self.max_file_chars]
+
+    def build_summaries(
+        self, repo_id: str, repo_path: Path, index_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Build or incrementally update the summary index of a repository.
+
+        Args:
+            repo_id: The repository identifier
+            repo_path: Path of the repository's working tree
+            index_id: Identity of the vector index the summaries belong to
+
+        Returns:
+            Dictionary with node counts and how many summaries were recomputed
+        """
+        previous = self.load_summaries(repo_id)
+        cached = {node["hash"]: node["summary"] for node in previous.values()}
+        nodes: Dict[str, Dict[str, Any]] = {}
+        children: Dict[str, Set[str]] = defaultdict(set)
+
+        file_jobs = []
+        for file_path in self.file_processor.get_code_files(repo_path):
+            path = file_path.relative_to(repo_path).as_posix()
+            try:
+                content = file_path.read_text(encoding="utf-8", errors="ignore")
+            except OSError as e:
+                print(f"Error reading {file_path}: {e}")
+                continue
+
+            content_hash = _hash("file", path, content)
+            nodes[path] = {
+                "kind": "file",
+                "hash": content_hash,
+                "summary": cached.get(content_hash),
+            }
+            if not nodes[path]["summary"]:
+                prompt = FILE_PROMPT.format(
+                    path=path, repo_id=repo_id, content=content[: self.max_file_chars]
+                )
+                file_jobs.append((path, lambda prompt=prompt: self._summarize(prompt)))
+
+            # Register the file and all of its ancestor directories
+            child = path
+            while child != ROOT:
+                parent = _parent(child)
+                if child in children[parent]:
+                    break
+                children[parent].add(child)
+                child = parent
+
+        if not nodes:
+            return {"status": "no_processable_files", "file_count": 0}
+
+        computed = len(file_jobs)
+        try:
+            self._run_jobs(file_jobs, nodes)
+
+            # Directories bottom-up, one depth level at a time
+            directories = sorted(children, key=_depth, reverse=True)
+            for depth in sorted({_depth(d) for d in directories}, reverse=True):
+                level_jobs = []
+                for directory in (d for d in directories if _depth(d) == depth):
+                    dir_children = sorted(children[directory])
+                    dir_hash = _hash(
+                        "dir",
+                        directory,
+                        *(f"{c}:{nodes[c]['hash']}" for c in dir_children),
+                    )
+                    nodes[directory] = {
+                        "kind": "directory",
+                        "hash": dir_hash,
+                        "summary": cached.get(dir_hash),
+                        "children": dir_children,
+                    }
+                    if nodes[directory]["summary"]:
+                        continue
+
+                    template = (
+                        OVERVIEW_PROMPT if directory == ROOT else DIRECTORY_PROMPT
+                    )
+                    prompt = template.format(
+                        path=directory,
+                        repo_id=repo_id,
+                        children=self._children_text(dir_children, nodes),
+                    )
+                    level_jobs.append(
+                        (directory, lambda prompt=prompt: self._summarize(prompt))
+                    )
+
+                computed += len(level_jobs)
+                self._run_jobs(level_jobs, nodes)
+        finally:
+            # Keep whatever was computed so a failed build can be resumed
+            self._save_summaries(repo_id, nodes, index_id)
+
+        return {
+            "status": "summarized",
+            "file_count": sum(1 for n in nodes.values() if n["kind"] == "file"),
+            "directory_count": len(children),
+            "computed": computed,
+            "reused": len(nodes) - computed,
+        }
+
+    def get_summary_context(self, repo_id: str) -> List[Dict[str, str]]:
+        """
+        Return summaries for answering a broad question, coarsest first.
+
+        The repository overview comes first, followed by directories and then
+        files in order of depth, until the context budget is used up.
+        """
+        nodes = self.load_summaries(repo_id)
+        if ROOT not in nodes:
+            return []
+
+        ordered = sorted(
+            nodes.items(),
+            key=lambda item: (item[1]["kind"] == "file", _depth(item[0]), item[0]),
+        )
+        context = []
+        used = 0
+        for path, node in ordered:
+            used += len(node["summary"])
+            if context and used > self.max_context_chars:
+                break
+            context.append(
+                {"path": path, "kind": node["kind"], "summary": node["summary"]}
+            )
+        return context
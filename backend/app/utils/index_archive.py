@@ -0,0 +1,186 @@
+"""
+Compact on-disk archive format for a repository's vector index.
+
+An archive is a single gzip stream laid out as::
+
+    magic (5 bytes) | version (uint16) | header length (uint32) | header JSON
+    record*         | end marker (uint32 zero)
+
+where every record is::
+
+    record length (uint32) | record JSON (id, document, metadata)
+    dimension (uint32)     | embedding (dimension x little-endian float32)
+
+Embeddings are stored as packed float arrays so an archive can be loaded
+back into Chroma without calling the embedding API again.
+"""
+
+import gzip
+import json
+import os
+import struct
+import sys
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+ARCHIVE_MAGIC = b"SCIDX"
+ARCHIVE_VERSION = 1
+
+_UINT16 = struct.Struct("<H")
+_UINT32 = struct.Struct("<I")
+
+# (id, document, metadata, embedding)
+IndexRecord = Tuple[str, str, Dict[str, Any], Sequence[float]]
+
+
+class IndexArchiveError(ValueError):
+    """Raised when an archive is malformed or uses an unsupported version."""
+
+
+def _pack_embedding(embedding: Sequence[float]) -> bytes:
+    if hasattr(embedding, "astype"):
+        # numpy arrays returned by Chroma can be packed without a Python loop
+        return embedding.astype("<f4").tobytes()
+    packed = array("f", embedding)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def write_index_archive(
+    path: Path, header: Dict[str, Any], records: Iterable[IndexRecord]
+) -> int:
+    """
+    Write records to ``path`` atomically and return the number written.
+
+    The archive is first written to a temporary sibling file and then moved
+    into place, so readers never observe a partially written archive.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+
+    count = 0
+    try:
+        with gzip.open(tmp_path, "wb", compresslevel=6) as fh:
+            count = write_index_stream(fh, header, records)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    return count
+
+
+def write_index_stream(
+    fh, header: Dict[str, Any], records: Iterable[IndexRecord]
+) -> int:
+    """Write an archive body to an already opened binary stream."""
+    header_bytes = json.dumps(header).encode("utf-8")
+    fh.write(ARCHIVE_MAGIC)
+    fh.write(_UINT16.pack(ARCHIVE_VERSION))
+    fh.write(_UINT32.pack(len(header_bytes)))
+    fh.write(header_bytes)
+
+    count = 0
+    for record_id, document, metadata, embedding in records:
+        record_bytes = json.dumps(
+            {"id": record_id, "document": document, "metadata": metadata}
+        ).encode("utf-8")
+        embedding_bytes = _pack_embedding(embedding)
+        fh.write(_UINT32.pack(len(record_bytes)))
+        fh.write(record_bytes)
+        fh.write(_UINT32.pack(len(embedding_bytes) // 4))
+        fh.write(embedding_bytes)
+        count += 1
+
+    fh.write(_UINT32.pack(0))
+    return count
+
+
+class IndexArchiveReader:
+    """Streaming reader yielding archive records in batches."""
+
+    def __init__(self, fh):
+        self._fh = fh
+        self.header = self._read_header()
+
+    def _read_exact(self, size: int) -> bytes:
+        data = self._fh.read(size)
+        if len(data) != size:
+            raise IndexArchiveError("Unexpected end of index archive")
+        return data
+
+    def _read_header(self) -> Dict[str, Any]:
+        if self._read_exact(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            raise IndexArchiveError("Not a SourceChat index archive")
+        (version,) = _UINT16.unpack(self._read_exact(_UINT16.size))
+        if version > ARCHIVE_VERSION:
+            raise IndexArchiveError(f"Unsupported index archive version: {version}")
+        (header_len,) = _UINT32.unpack(self._read_exact(_UINT32.size))
+        header = json.loads(self._read_exact(header_len))
+        header["format_version"] = version
+        return header
+
+    def iter_batches(
+        self, batch_size: int = 500
+    ) -> Iterator[Tuple[List[str], List[str], List[Dict[str, Any]], Any]]:
+        """
+        Yield ``(ids, documents, metadatas, embeddings)`` batches.
+
+        Embeddings of a batch are read into one contiguous buffer and exposed
+        as a numpy view over it, avoiding a per-float conversion.
+        """
+        import numpy as np
+
+        while True:
+            ids, documents, metadatas = [], [], []
+            buffer = bytearray()
+            dimension = None
+
+            while len(ids) < batch_size:
+                (record_len,) = _UINT32.unpack(self._read_exact(_UINT32.size))
+                if record_len == 0:
+                    break
+                record = json.loads(self._read_exact(record_len))
+                (record_dim,) = _UINT32.unpack(self._read_exact(_UINT32.size))
+                if dimension is None:
+                    dimension = record_dim
+                elif record_dim != dimension:
+                    raise IndexArchiveError("Inconsistent embedding dimensions")
+                buffer += self._read_exact(record_dim * 4)
+                ids.append(record["id"])
+                documents.append(record["document"])
+                metadatas.append(record["metadata"])
+
+            if ids:
+                embeddings = np.frombuffer(buffer, dtype="<f4").reshape(
+                    len(ids), dimension
+                )
+                yield ids, documents, metadatas, embeddings
+
+            if len(ids) < batch_size:
+                return
+
+
+@contextmanager
+def open_index_archive(source: Union[Path, BinaryIO]) -> Iterator[IndexArchiveReader]:
+    """Open an archive from a path or binary file object for streaming reads."""
+    if hasattr(source, "read"):
+        fh = gzip.GzipFile(fileobj=source, mode="rb")
+    else:
+        fh = gzip.open(Path(source), "rb")
+    with fh:
+        yield IndexArchiveReader(fh)
@@ -0,0 +1,74 @@
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict
+
+
+def _metric_key(name: str, labels: Dict[str, Any]) -> str:
+    """Build a flat metric key such as ``chat_latency_seconds{start=cold}``."""
+    if not labels:
+        return name
+    label_str = ",".join(f"{key}={labels[key]}" for key in sorted(labels))
+    return f"{name}{{{label_str}}}"
+
+
+class Metrics:
+    """Minimal in-process metrics registry (counters, gauges and timings)."""
+
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, Deque[float]] = {}
+
+    def increment(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Increase a counter by ``value``."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge to an absolute value."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record a timing sample (kept in a bounded window)."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            if key not in self._timings:
+                self._timings[key] = deque(maxlen=self.max_samples)
+            self._timings[key].append(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serialisable view of all metrics."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            timings = {key: sorted(samples) for key, samples in self._timings.items()}
+
+        summaries = {}
+        for key, samples in timings.items():
+            if not samples:
+                continue
+            summaries[key] = {
+                "count": len(samples),
+                "avg": round(sum(samples) / len(samples), 6),
+                "p50": round(samples[int(0.5 * (len(samples) - 1))], 6),
+                "p95": round(samples[int(0.95 * (len(samples) - 1))], 6),
+                "max": round(samples[-1], 6),
+            }
+
+        return {"counters": counters, "gauges": gauges, "timings": summaries}
+
+    def reset(self) -> None:
+        """Clear all recorded metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+
+# Process-wide registry shared by services and routers
+metrics = Metrics()
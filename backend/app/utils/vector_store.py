@@ -0,0 +1,257 @@
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+# Metadata key holding the ancestor directory of a chunk's file at a given
+# depth, e.g. dir_2 = "app/services" for "app/services/git_service.py"
+DIRECTORY_KEY = "dir_{depth}"
+
+# Held while a repository's collection is opened by name, and while a rebuilt
+# collection is renamed into place, so a reader never resolves the name in the
+# middle of a swap (and never creates an empty collection under it)
+_name_locks_lock = threading.Lock()
+_name_locks: Dict[str, threading.RLock] = {}
+
+
+def get_collection_name(repo_id: str) -> str:
+    """Return the Chroma collection name used for a repository."""
+    return f"repo_{repo_id}".replace("-", "_").replace(".", "_")
+
+
+@contextmanager
+def _name_lock(repo_id: str) -> Iterator[None]:
+    with _name_locks_lock:
+        lock = _name_locks.setdefault(repo_id, threading.RLock())
+    with lock:
+        yield
+
+
+def open_vectorstore(
+    repo_id: str,
+    persist_dir: Path,
+    embedding_function: Optional[Any] = None,
+    collection_metadata: Optional[Dict[str, Any]] = None,
+):
+    """Open (or create) the Chroma vector store backing a repository."""
+    from langchain_chroma import Chroma
+
+    with _name_lock(repo_id):
+        return Chroma(
+            collection_name=get_collection_name(repo_id),
+            embedding_function=embedding_function,
+            persist_directory=str(persist_dir),
+            collection_metadata=collection_metadata,
+        )
+
+
+def get_index_id(collection) -> str:
+    """
+    Return the build identity of a collection.
+
+    Every rebuild gets a new ``index_id`` (see ``replace_collection``), which
+    is kept when the collection is archived and restored.
+    """
+    return (collection.metadata or {}).get("index_id") or str(collection.id)
+
+
+def replace_collection(
+    repo_id: str,
+    persist_dir: Path,
+    load: Callable[[Any], Any],
+    embedding_function: Optional[Any] = None,
+    collection_metadata: Optional[Dict[str, Any]] = None,
+    swap_lock: Optional[ContextManager[Any]] = None,
+) -> Any:
+    """
+    Rebuild a repository's collection without exposing a partial index.
+
+    ``load`` fills a staging vector store, which replaces the live collection
+    only once it returns. If it raises, the staging collection is dropped and
+    the live collection is left untouched. Concurrent rebuilds each stage into
+    their own collection; the last one to finish wins.
+
+    Args:
+        collection_metadata: Metadata of the new collection; it gets a fresh
+                             ``index_id`` unless one is given here
+        swap_lock: Held while the staging collection is swapped in, e.g. the
+                   repository's storage lock
+
+    Returns:
+        The value returned by ``load``
+    """
+    from langchain_chroma import Chroma
+
+    collection_name = get_collection_name(repo_id)
+    # "." never occurs in names from get_collection_name, so these cannot
+    # collide with another repository's collection
+    staging = Chroma(
+        collection_name=f"{collection_name}.staging.{uuid.uuid4().hex}",
+        embedding_function=embedding_function,
+        persist_directory=str(persist_dir),
+        collection_metadata={
+            "index_id": uuid.uuid4().hex,
+            **(collection_metadata or {}),
+        },
+    )
+    try:
+        result = load(staging)
+    except BaseException:
+        staging.delete_collection()
+        raise
+
+    # The previous collection is renamed aside rather than deleted first, so
+    # the swap can be rolled back and readers always find a complete index
+    retired_name = f"{collection_name}.retired.{uuid.uuid4().hex}"
+    with swap_lock or nullcontext(), _name_lock(repo_id):
+        live = open_vectorstore(repo_id, persist_dir)._collection
+        live.modify(name=retired_name)
+        try:
+            staging._collection.modify(name=collection_name)
+        except BaseException:
+            live.modify(name=collection_name)
+            staging.delete_collection()
+            raise
+    staging._client.delete_collection(retired_name)
+    return result
+
+
+def normalize_path_prefix(path_prefix: str) -> str:
+    """Normalize a repository-relative path prefix to ``a/b`` form."""
+    parts = path_prefix.replace("\\", "/").split("/")
+    return "/".join(part for part in parts if part and part != ".")
+
+
+def directory_metadata(file_path: str) -> Dict[str, str]:
+    """
+    Return the ancestor-directory metadata keys of a file.
+
+    Chroma metadata filters only support exact comparisons, so every ancestor
+    directory is stored under its own key to make path prefix filters an
+    equality match inside the index.
+    """
+    parts = normalize_path_prefix(file_path).split("/")[:-1]
+    return {
+        DIRECTORY_KEY.format(depth=depth): "/".join(parts[:depth])
+        for depth in range(1, len(parts) + 1)
+    }
+
+
+def build_metadata_filter(
+    file_extensions: Optional[List[str]] = None, path_prefix: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Build a Chroma ``where`` filter for chunk metadata.
+
+    Args:
+        file_extensions: Extensions to match (with or without the leading dot)
+        path_prefix: Directory (or file) path the chunks must be under
+
+    Returns:
+        The filter, or None if no filter applies
+    """
+    conditions = []
+
+    extensions = sorted(
+        {f".{ext.lstrip('.')}" for ext in file_extensions or [] if ext.strip(".")}
+    )
+    if len(extensions) == 1:
+        conditions.append({"file_extension": extensions[0]})
+    elif extensions:
+        conditions.append({"file_extension": {"$in": extensions}})
+
+    prefix = normalize_path_prefix(path_prefix or "")
+    if prefix:
+        depth = prefix.count("/") + 1
+        conditions.append(
+            {
+                "$or": [
+                    {DIRECTORY_KEY.format(depth=depth): prefix},
+                    {"file_path": prefix},
+                ]
+            }
+        )
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+def collection_disk_bytes(collection, persist_dir: Path) -> int:
+    """
+    Return the on-disk size of a collection without reading its records.
+
+    Counts the files of the collection's vector segment directories plus the
+    document and metadata bytes of its rows in Chroma's shared SQLite file
+    (computed by an aggregate query, so no embeddings are loaded).
+    """
+    database = Path(persist_dir) / "chroma.sqlite3"
+    if not database.exists():
+        return 0
+
+    connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    try:
+        segments = connection.execute(
+            "SELECT id, scope FROM segments WHERE collection = ?",
+            (str(collection.id),),
+        ).fetchall()
+        total = 0
+        for segment_id, scope in segments:
+            if scope == "VECTOR":
+                segment_dir = Path(persist_dir) / segment_id
+                if segment_dir.is_dir():
+                    total += sum(
+                        f.stat().st_size for f in segment_dir.iterdir() if f.is_file()
+                    )
+            else:
+                (row_bytes,) = connection.execute(
+                    "SELECT SUM(LENGTH(m.key) + LENGTH(COALESCE(m.string_value, '')))"
+                    " FROM embeddings e JOIN embedding_metadata m ON m.id = e.id"
+                    " WHERE e.segment_id = ?",
+                    (segment_id,),
+                ).fetchone()
+                total += row_bytes or 0
+        return total
+    finally:
+        connection.close()
+
+
+def iter_collection_pages(collection, page_size: int = 500) -> Iterator[Tuple]:
+    """Yield ``(ids, documents, metadatas, embeddings)`` pages of a collection."""
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["documents", "metadatas", "embeddings"],
+            limit=page_size,
+            offset=offset,
+        )
+        if not page["ids"]:
+            return
+        yield page["ids"], page["documents"], page["metadatas"], page["embeddings"]
+        offset += len(page["ids"])
+
+
+def iter_collection_records(collection) -> Iterator[Tuple]:
+    """Yield ``(id, document, metadata, embedding)`` records of a collection."""
+    for ids, documents, metadatas, embeddings in iter_collection_pages(collection):
+        yield from zip(ids, documents, metadatas, embeddings)
+
+
+def load_archive_batches(collection, reader, batch_size: int = 1000) -> int:
+    """
+    Bulk-load the records of an open index archive into a collection.
+
+    Precomputed embeddings are passed straight through, so no embedding API
+    calls are made. Returns the number of records loaded.
+    """
+    count = 0
+    for ids, documents, metadatas, embeddings in reader.iter_batches(batch_size):
+        collection.upsert(
+            ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings
+        )
+        count += len(ids)
+    return count
@@ -0,0 +1,109 @@
+"""
+Load test for chat request coalescing and query-embedding micro-batching.
+
+Simulates many concurrent users asking a small set of popular questions
+against an upstream that only serves a limited number of calls at once, and
+compares upstream call counts and latency with and without coalescing.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_chat_coalescing [--requests 200] [--questions 20]
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.coalescing import MicroBatchingEmbeddings, SingleFlight
+from langchain_core.embeddings import Embeddings
+
+
+class SimulatedUpstream:
+    """Upstream API with fixed latency and limited concurrency."""
+
+    def __init__(self, concurrency: int, embed_latency: float, chat_latency: float):
+        self.slots = threading.Semaphore(concurrency)
+        self.embed_latency = embed_latency
+        self.chat_latency = chat_latency
+        self.embed_calls = 0
+        self.chat_calls = 0
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        with self.slots:
+            with self._lock:
+                self.embed_calls += 1
+            time.sleep(self.embed_latency)
+        return [[float(len(text))] for text in texts]
+
+    def chat(self, vector):
+        with self.slots:
+            with self._lock:
+                self.chat_calls += 1
+            time.sleep(self.chat_latency)
+        return {"answer": str(vector)}
+
+
+class UpstreamEmbeddings(Embeddings):
+    def __init__(self, upstream: SimulatedUpstream):
+        self.upstream = upstream
+
+    def embed_documents(self, texts):
+        return self.upstream.embed(texts)
+
+    def embed_query(self, text):
+        return self.upstream.embed([text])[0]
+
+
+async def run_load(questions, coalesce: bool, upstream: SimulatedUpstream):
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=64)
+    embeddings = UpstreamEmbeddings(upstream)
+    if coalesce:
+        embeddings = MicroBatchingEmbeddings(embeddings, max_wait_ms=5)
+    flight = SingleFlight("bench")
+
+    def answer(question):
+        return upstream.chat(embeddings.embed_query(question))
+
+    async def request(question):
+        start = time.perf_counter()
+        if coalesce:
+            await flight.run(
+                question, lambda: loop.run_in_executor(pool, answer, question)
+            )
+        else:
+            await loop.run_in_executor(pool, answer, question)
+        return time.perf_counter() - start
+
+    latencies = sorted(await asyncio.gather(*(request(q) for q in questions)))
+    pool.shutdown()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    questions = [f"question {i % args.questions}" for i in range(args.requests)]
+
+    for coalesce in (False, True):
+        upstream = SimulatedUpstream(
+            args.concurrency, embed_latency=0.04, chat_latency=0.2
+        )
+        latencies = asyncio.run(run_load(questions, coalesce, upstream))
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        print(
+            f"{'coalesced' if coalesce else 'baseline ':>9}: "
+            f"embed calls={upstream.embed_calls:4d} "
+            f"chat calls={upstream.chat_calls:4d} "
+            f"p50={latencies[len(latencies) // 2]:.3f}s p95={p95:.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
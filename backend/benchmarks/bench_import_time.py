@@ -0,0 +1,98 @@
+"""
+Import-time profile of the FastAPI application.
+
+Imports ``main`` in fresh interpreters with ``-X importtime`` and reports the
+median cumulative import time together with the slowest modules. Exits with
+a non-zero status if the import exceeds the budget or pulls in any of the
+heavy RAG stacks, which must only be loaded by the background warm-up.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_import_time [--runs 5] [--budget-ms 1000]
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Top-level packages that must not be imported by ``import main``
+HEAVY_MODULES = (
+    "langchain",
+    "langchain_core",
+    "langchain_chroma",
+    "langchain_openai",
+    "chromadb",
+    "openai",
+    "numpy",
+    "onnxruntime",
+)
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile_import() -> Tuple[int, Dict[str, int]]:
+    """Return the cumulative import time of ``main`` and per-module times (us)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, name = int(match.group(2)), match.group(4)
+        modules[name] = cumulative
+        if name == "main":
+            total = cumulative
+    return total, modules
+
+
+def heavy_imports(modules: Dict[str, int]) -> List[str]:
+    """Return the heavy top-level packages present in an import profile."""
+    loaded = {name.split(".")[0] for name in modules}
+    return [name for name in HEAVY_MODULES if name in loaded]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    # The first run also warms the bytecode cache
+    profile_import()
+    runs = [profile_import() for _ in range(args.runs)]
+    median_ms = statistics.median(total for total, _ in runs) / 1000
+    modules = runs[-1][1]
+
+    print(f"import main: median {median_ms:.1f} ms over {args.runs} runs")
+    print("slowest top-level imports (cumulative):")
+    top_level = {name: us for name, us in modules.items() if "." not in name}
+    for name, us in sorted(top_level.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"import time {median_ms:.1f} ms exceeds {args.budget_ms} ms")
+    heavy = heavy_imports(modules)
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
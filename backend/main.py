@@ -3,16 +3,58 @@ SourceChat API - A FastAPI application for GitHub repository analysis and chat.
 
 This application provides endpoints for cloning GitHub repositories and
 performing chat-based queries on their contents using RAG (Retrieval-Augmented Generation).
+
+The heavy LangChain, Chroma and OpenAI stacks are not imported at startup.
+They are loaded by a background warm-up task once the server is accepting
+requests, so ``/health`` answers immediately and ``/ready`` reports when the
+RAG services can serve traffic.
 """
 
-from app.routers import router
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+from app.routers import api, router
+from app.routers.api import get_rag_service
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Readiness of the background warm-up, reported by /ready
+warmup_state: Dict[str, Any] = {"status": "starting", "error": None, "seconds": None}
+
+
+def warm_up_services() -> None:
+    """Import the RAG stacks and build the shared RAGService."""
+    start = time.perf_counter()
+    try:
+        import chromadb  # noqa: F401
+        import langchain.chains  # noqa: F401
+        import langchain_chroma  # noqa: F401
+
+        get_rag_service()
+        warmup_state.update({"status": "ready", "error": None})
+    except Exception as e:
+        warmup_state.update({"status": "error", "error": str(e)})
+    finally:
+        warmup_state["seconds"] = round(time.perf_counter() - start, 3)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start warming up services in the background without delaying startup."""
+    if os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true":
+        app.state.warmup_task = asyncio.create_task(run_in_threadpool(warm_up_services))
+    yield
+
+
 # Initialize FastAPI application with metadata for documentation
 app = FastAPI(
     title="SourceChat API",
@@ -20,6 +62,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Configure CORS middleware to allow frontend access
@@ -38,9 +81,27 @@ app.include_router(router)
 @app.get("/health", tags=["health"])
 async def health_check():
     """
-    Health check endpoint.
+    Liveness check endpoint.
 
     Returns:
         dict: Status message indicating the API is healthy and operational
     """
     return {"status": "healthy"}
+
+
+@app.get("/ready", tags=["health"])
+async def readiness_check():
+    """
+    Readiness check endpoint.
+
+    The services also count as ready once the first request has built them
+    lazily, e.g. when the startup warm-up is disabled.
+
+    Returns:
+        JSONResponse: 200 once the RAG services are warmed up, otherwise 503
+                      with the warm-up status and any error
+    """
+    if warmup_state["status"] != "ready" and api.get_rag_service.cache_info().currsize:
+        warmup_state.update({"status": "ready", "error": None})
+    status_code = 200 if warmup_state["status"] == "ready" else 503
+    return JSONResponse(status_code=status_code, content=warmup_state)
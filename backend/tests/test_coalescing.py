@@ -0,0 +1,99 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app.services.coalescing import MicroBatchingEmbeddings, SingleFlight
+from langchain_core.embeddings import Embeddings
+
+
+class RecordingEmbeddings(Embeddings):
+    """Fake upstream embeddings that record every call."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+# Test identical in-flight calls share one computation
+def test_single_flight_deduplicates_concurrent_calls():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value * 2
+
+    async def main():
+        return await asyncio.gather(
+            flight.run("a", lambda: compute(1)),
+            flight.run("a", lambda: compute(1)),
+            flight.run("b", lambda: compute(5)),
+        )
+
+    assert asyncio.run(main()) == [2, 2, 10]
+    assert calls == [1, 5]
+
+
+# Test a finished call is not reused for later requests
+def test_single_flight_releases_key_after_completion():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        first = await flight.run("a", compute)
+        second = await flight.run("a", compute)
+        return first, second
+
+    assert asyncio.run(main()) == (1, 2)
+
+
+# Test concurrent queries are merged into fewer upstream calls
+def test_micro_batching_merges_concurrent_queries():
+    upstream = RecordingEmbeddings()
+    embeddings = MicroBatchingEmbeddings(upstream, max_wait_ms=50, max_batch_size=64)
+    texts = [f"question {i % 4}" * (i % 4 + 1) for i in range(16)]
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(embeddings.embed_query, texts))
+
+    assert results == [[float(len(text)), 1.0] for text in texts]
+    assert len(upstream.calls) < len(texts)
+    # Duplicate questions inside a batch are embedded once
+    assert all(len(call) == len(set(call)) for call in upstream.calls)
+
+
+# Test batches never exceed the configured size
+def test_micro_batching_respects_max_batch_size():
+    upstream = RecordingEmbeddings()
+    embeddings = MicroBatchingEmbeddings(upstream, max_wait_ms=50, max_batch_size=3)
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        list(pool.map(embeddings.embed_query, [f"q{i}" for i in range(10)]))
+
+    assert all(len(call) <= 3 for call in upstream.calls)
+    assert sum(len(call) for call in upstream.calls) == 10
+
+
+# Test upstream errors reach every caller in the batch
+def test_micro_batching_propagates_errors():
+    embeddings = MicroBatchingEmbeddings(RecordingEmbeddings(fail=True), max_wait_ms=1)
+
+    with pytest.raises(RuntimeError, match="upstream down"):
+        embeddings.embed_query("question")
@@ -36,6 +36,17 @@ def test_clone_repository_success(git_service, mock_repo_clone, tmp_path):
     assert (tmp_path / "repos" / "cpython").exists()
 
 
+# Test cloning into an explicit repository ID
+def test_clone_repository_target_id(git_service, mock_repo_clone, tmp_path):
+    repo_url = "https://github.com/python/cpython.git"
+    repo_id = git_service.clone_repository(repo_url, repo_id="cpython-fork")
+
+    assert repo_id == "cpython-fork"
+    mock_repo_clone.assert_called_once_with(
+        repo_url, tmp_path / "repos" / "cpython-fork"
+    )
+
+
 # Test non-GitHub URL validation
 def test_clone_repository_invalid_url(git_service):
     repo_url = "https://bitbucket.org/user/repo.git"
@@ -0,0 +1,258 @@
+import threading
+import time
+
+import anyio
+import pytest
+from app.services.scheduler import (
+    BULK,
+    INTERACTIVE,
+    LLMScheduler,
+    ScheduledEmbeddings,
+    SchedulerRejected,
+    scheduler_context,
+)
+from app.utils.metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def hold_slot(scheduler, **kwargs):
+    """Occupy one scheduler slot in a background thread until released."""
+    admitted = threading.Event()
+    release = threading.Event()
+
+    def run():
+        with scheduler.admit(1, **kwargs):
+            admitted.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert admitted.wait(5)
+    return release, thread
+
+
+def enqueue(scheduler, order, label, priority, client_id):
+    """Start a call that records ``label`` once admitted."""
+
+    def run():
+        with scheduler.admit(1, priority=priority, client_id=client_id):
+            order.append(label)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def wait_for_depth(scheduler, priority, depth):
+    deadline = time.monotonic() + 5
+    while scheduler.queue_depth(priority) < depth:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+# Test interactive calls are dispatched before queued bulk work
+def test_interactive_served_before_bulk():
+    scheduler = LLMScheduler(max_concurrency=1, interactive_reserved=0)
+    release, holder = hold_slot(scheduler, priority=BULK)
+    order = []
+
+    threads = [enqueue(scheduler, order, "bulk", BULK, "ingest")]
+    wait_for_depth(scheduler, BULK, 1)
+    threads.append(enqueue(scheduler, order, "chat", INTERACTIVE, "user"))
+    wait_for_depth(scheduler, INTERACTIVE, 1)
+
+    release.set()
+    for thread in [holder, *threads]:
+        thread.join(5)
+
+    assert order == ["chat", "bulk"]
+
+
+# Test clients within a priority class are served round-robin
+def test_round_robin_across_clients():
+    scheduler = LLMScheduler(max_concurrency=1)
+    release, holder = hold_slot(scheduler)
+    order = []
+
+    threads = []
+    for i, client_id in enumerate(["a", "a", "a", "b"]):
+        threads.append(enqueue(scheduler, order, client_id, INTERACTIVE, client_id))
+        wait_for_depth(scheduler, INTERACTIVE, i + 1)
+
+    release.set()
+    for thread in [holder, *threads]:
+        thread.join(5)
+
+    assert order == ["a", "b", "a", "a"]
+
+
+# Test bulk work cannot take the slots reserved for interactive calls
+def test_bulk_cannot_use_reserved_slots():
+    scheduler = LLMScheduler(
+        max_concurrency=2,
+        interactive_reserved=1,
+        timeouts={INTERACTIVE: 1.0, BULK: 0.1},
+    )
+    release, holder = hold_slot(scheduler, priority=BULK)
+
+    with pytest.raises(SchedulerRejected):
+        with scheduler.admit(1, priority=BULK):
+            pass
+    with scheduler.admit(1, priority=INTERACTIVE):
+        pass
+
+    release.set()
+    holder.join(5)
+
+
+# Test calls that cannot get budget before their deadline are shed with 429
+def test_rate_limited_call_is_rejected_immediately():
+    scheduler = LLMScheduler(
+        tokens_per_minute=600, timeouts={INTERACTIVE: 1.0, BULK: 1.0}
+    )
+    with scheduler.admit(600):
+        pass
+
+    start = time.monotonic()
+    with pytest.raises(SchedulerRejected) as excinfo:
+        with scheduler.admit(100):
+            pass
+
+    assert time.monotonic() - start < 0.5
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.reason == "rate_limited"
+    assert 9 <= excinfo.value.retry_after <= 11
+    counters = metrics.snapshot()["counters"]
+    assert (
+        counters["scheduler_rejections_total{priority=interactive,reason=rate_limited}"]
+        == 1
+    )
+
+
+# Test a full queue sheds new calls with 503
+def test_full_queue_rejects_with_503():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue_size=1)
+    release, holder = hold_slot(scheduler)
+    waiter = enqueue(scheduler, [], "waiter", INTERACTIVE, "a")
+    wait_for_depth(scheduler, INTERACTIVE, 1)
+
+    with pytest.raises(SchedulerRejected) as excinfo:
+        with scheduler.admit(1):
+            pass
+
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.reason == "queue_full"
+    assert (
+        metrics.snapshot()["gauges"]["scheduler_queue_depth{priority=interactive}"] == 1
+    )
+
+    release.set()
+    for thread in (holder, waiter):
+        thread.join(5)
+
+
+# Test queued calls give up once their deadline passes
+def test_deadline_exceeded_while_queued():
+    scheduler = LLMScheduler(max_concurrency=1, timeouts={INTERACTIVE: 0.1, BULK: 0.1})
+    release, holder = hold_slot(scheduler)
+
+    with pytest.raises(SchedulerRejected) as excinfo:
+        with scheduler.admit(1):
+            pass
+
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.reason == "deadline_exceeded"
+    assert scheduler.queue_depth(INTERACTIVE) == 0
+
+    release.set()
+    holder.join(5)
+
+
+# Test calls nested in an admitted block do not queue behind themselves
+def test_nested_admission_does_not_deadlock():
+    scheduler = LLMScheduler(max_concurrency=1, timeouts={INTERACTIVE: 0.5, BULK: 0.5})
+    with scheduler.admit(10):
+        with scheduler.admit(10):
+            pass
+
+    timing = metrics.snapshot()["timings"][
+        "scheduler_wait_seconds{priority=interactive}"
+    ]
+    assert timing["count"] == 1
+
+
+# Test calls nested in an admitted block are not charged a second time
+def test_nested_admission_consumes_no_budget():
+    scheduler = LLMScheduler(
+        tokens_per_minute=600, timeouts={INTERACTIVE: 0.5, BULK: 0.5}
+    )
+    with scheduler.admit(300):
+        with scheduler.admit(300):
+            pass
+
+    with scheduler.admit(300):
+        pass
+
+
+# Test embeddings are admitted per batch under the caller's priority
+def test_scheduled_embeddings_admit_each_batch():
+    class FakeEmbeddings:
+        def __init__(self):
+            self.calls = []
+
+        def embed_documents(self, texts):
+            self.calls.append(list(texts))
+            return [[1.0] for _ in texts]
+
+    upstream = FakeEmbeddings()
+    embeddings = ScheduledEmbeddings(upstream, LLMScheduler(), batch_size=2)
+
+    with scheduler_context(BULK, "ingest"):
+        vectors = embeddings.embed_documents(["a", "b", "c", "d", "e"])
+
+    assert len(vectors) == 5
+    assert upstream.calls == [["a", "b"], ["c", "d"], ["e"]]
+    timing = metrics.snapshot()["timings"]["scheduler_wait_seconds{priority=bulk}"]
+    assert timing["count"] == 3
+
+
+# Test waiting calls use their own threads and overflow is shed, not queued
+def test_scheduled_threads_do_not_starve_default_pool(monkeypatch):
+    from app.services import scheduler as scheduler_module
+
+    scheduler = LLMScheduler(max_concurrency=1, max_queue_size=1)
+    monkeypatch.setattr(scheduler_module, "get_scheduler", lambda: scheduler)
+    monkeypatch.setenv("SCHEDULER_THREAD_HEADROOM", "1")
+    scheduler_module.get_thread_limiter.cache_clear()
+    release = threading.Event()
+
+    def hold():
+        with scheduler.admit(1):
+            release.wait(5)
+
+    async def main():
+        # Only two threads in the default pool, as if it were nearly exhausted
+        anyio.to_thread.current_default_thread_limiter().total_tokens = 2
+        async with anyio.create_task_group() as group:
+            group.start_soon(scheduler_module.run_scheduled, hold)
+            group.start_soon(scheduler_module.run_scheduled, hold)
+            while scheduler.queue_depth(INTERACTIVE) < 1:
+                await anyio.sleep(0.005)
+
+            with pytest.raises(SchedulerRejected) as excinfo:
+                await scheduler_module.run_scheduled(hold)
+            assert excinfo.value.reason == "queue_full"
+            assert await anyio.to_thread.run_sync(lambda: "served") == "served"
+            release.set()
+
+    try:
+        anyio.run(main)
+    finally:
+        release.set()
+        scheduler_module.get_thread_limiter.cache_clear()
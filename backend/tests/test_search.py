@@ -0,0 +1,223 @@
+import threading
+import time
+
+import pytest
+from app.routers import api
+from app.services.coalescing import MicroBatchingEmbeddings
+from app.services.scheduler import (
+    BULK,
+    INTERACTIVE,
+    LLMScheduler,
+    ScheduledEmbeddings,
+)
+from app.utils.vector_store import build_metadata_filter, directory_metadata
+from fastapi.testclient import TestClient
+
+VOCABULARY = ["clone", "git", "repository", "embedding", "chat", "readme", "test"]
+
+
+class KeywordEmbeddings:
+    """Deterministic fake embeddings counting vocabulary words."""
+
+    def __init__(self):
+        self.calls = []
+
+    def _embed(self, text):
+        words = text.lower().split()
+        return [float(sum(word.startswith(v) for word in words)) for v in VOCABULARY]
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+# Fixture for a processed repository backed by fake embeddings
+@pytest.fixture
+def rag_service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("CHROMA_PERSIST_DIRECTORY", str(tmp_path / "chromadb"))
+    from app.services.rag_service import RAGService
+
+    repo = tmp_path / "repos" / "demo"
+    (repo / "app" / "services").mkdir(parents=True)
+    (repo / "app" / "routers").mkdir(parents=True)
+    (repo / "app" / "services" / "git_service.py").write_text(
+        "def clone_repository(url):\n    return git clone repository\n"
+    )
+    (repo / "app" / "services" / "rag_service.py").write_text(
+        "def chat(question):\n    return embedding chat\n"
+    )
+    (repo / "app" / "routers" / "api.py").write_text(
+        "def clone_endpoint():\n    return clone repository\n"
+    )
+    (repo / "README.md").write_text("# Readme\n\nclone the git repository\n")
+    # A file large enough to be split into several chunks
+    (repo / "app" / "big.py").write_text(
+        "".join(f"def test_{i}(): return {i}  # padding\n" for i in range(300))
+    )
+
+    service = RAGService()
+    service.upstream = KeywordEmbeddings()
+    service.embeddings = ScheduledEmbeddings(service.upstream, LLMScheduler())
+    service.process_repository("demo")
+    service.upstream.calls.clear()
+    return service
+
+
+# Test chunk metadata carries directory keys for in-index prefix filters
+def test_directory_metadata_and_filters():
+    assert directory_metadata("app/services/git.py") == {
+        "dir_1": "app",
+        "dir_2": "app/services",
+    }
+    assert directory_metadata("main.py") == {}
+    assert build_metadata_filter(["py", ".md"], "./app/services/") == {
+        "$and": [
+            {"file_extension": {"$in": [".md", ".py"]}},
+            {"$or": [{"dir_2": "app/services"}, {"file_path": "app/services"}]},
+        ]
+    }
+    assert build_metadata_filter([], "") is None
+
+
+# Test hits report file paths and the line range of each chunk
+def test_search_returns_line_ranges(rag_service, tmp_path):
+    [result] = rag_service.search("demo", ["test"], limit=100, path_prefix="app/big.py")
+
+    hits = result["hits"]
+    assert len(hits) > 1
+    assert {hit["file_path"] for hit in hits} == {"app/big.py"}
+
+    lines = (tmp_path / "repos" / "demo" / "app" / "big.py").read_text().splitlines()
+    for hit in hits:
+        expected = "\n".join(lines[hit["start_line"] - 1 : hit["end_line"]])
+        assert hit["content"] == expected
+
+
+# Test filters are applied inside the index so pages are filled with matches
+def test_search_filters(rag_service):
+    [result] = rag_service.search("demo", ["clone repository"], file_extensions=["md"])
+    assert [hit["file_path"] for hit in result["hits"]] == ["README.md"]
+
+    [result] = rag_service.search(
+        "demo", ["clone repository"], limit=2, path_prefix="app/services"
+    )
+    assert {hit["file_path"] for hit in result["hits"]} == {
+        "app/services/git_service.py",
+        "app/services/rag_service.py",
+    }
+    assert result["hits"][0]["file_path"] == "app/services/git_service.py"
+
+
+# Test pagination returns consecutive ranks and reports further pages
+def test_search_pagination(rag_service):
+    [first] = rag_service.search("demo", ["clone repository"], limit=2)
+    [second] = rag_service.search("demo", ["clone repository"], limit=2, offset=2)
+
+    assert [hit["rank"] for hit in first["hits"]] == [1, 2]
+    assert [hit["rank"] for hit in second["hits"]] == [3, 4]
+    assert first["has_more"] and second["has_more"]
+    first_ids = {(h["file_path"], h["start_line"]) for h in first["hits"]}
+    assert first_ids.isdisjoint(
+        (h["file_path"], h["start_line"]) for h in second["hits"]
+    )
+
+
+# Test a batch of queries is embedded in one upstream call
+def test_batch_search_single_embedding_call(rag_service):
+    results = rag_service.search("demo", ["clone", "embedding chat", "readme"], limit=1)
+
+    assert [result["query"] for result in results] == [
+        "clone",
+        "embedding chat",
+        "readme",
+    ]
+    assert results[1]["hits"][0]["file_path"] == "app/services/rag_service.py"
+    assert results[2]["hits"][0]["file_path"] == "README.md"
+    assert len(rag_service.upstream.calls) == 1
+
+
+# Test reprocessing replaces the previous chunks instead of duplicating them
+def test_reprocess_does_not_duplicate_chunks(rag_service, tmp_path):
+    chunk_count = rag_service.get_repository_status("demo")["chunk_count"]
+    (tmp_path / "repos" / "demo" / "README.md").write_text("# Readme\n\nchat\n")
+
+    result = rag_service.process_repository("demo")
+
+    assert result["chunk_count"] == chunk_count
+    assert rag_service.get_repository_status("demo")["chunk_count"] == chunk_count
+    [page] = rag_service.search("demo", ["readme"], limit=50, file_extensions=["md"])
+    assert [hit["content"] for hit in page["hits"]] == ["# Readme\n\nchat"]
+    assert not page["has_more"]
+
+
+# Test a search leading a micro-batch does not deadlock with an admitted chat
+def test_search_and_chat_share_micro_batch(rag_service):
+    scheduler = LLMScheduler(max_concurrency=1, timeouts={INTERACTIVE: 1, BULK: 1})
+    rag_service.scheduler = scheduler
+    rag_service.embeddings = MicroBatchingEmbeddings(
+        ScheduledEmbeddings(rag_service.upstream, scheduler), max_wait_ms=200
+    )
+    errors = []
+
+    def search():
+        try:
+            rag_service.search("demo", ["clone"])
+        except Exception as e:
+            errors.append(e)
+
+    def chat():
+        # What an admitted chat does when its chain embeds the question
+        try:
+            with scheduler.admit(10, requests=2):
+                rag_service.embeddings.embed_query("embedding chat")
+        except Exception as e:
+            errors.append(e)
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=search), threading.Thread(target=chat)]
+    threads[0].start()
+    time.sleep(0.02)
+    threads[1].start()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == []
+    assert time.monotonic() - start < 1
+
+
+# Test the GET and POST search endpoints
+def test_search_endpoints(rag_service, monkeypatch):
+    monkeypatch.setenv("WARMUP_ON_STARTUP", "false")
+    import main
+
+    main.app.dependency_overrides[api.get_rag_service] = lambda: rag_service
+    try:
+        client = TestClient(main.app)
+
+        response = client.get(
+            "/api/v1/repos/demo/search",
+            params={"query": "chat", "file_extension": ".py", "limit": 1},
+        )
+        assert response.status_code == 200
+        [result] = response.json()["results"]
+        assert result["hits"][0]["file_path"] == "app/services/rag_service.py"
+        assert result["hits"][0]["start_line"] == 1
+
+        response = client.post(
+            "/api/v1/repos/demo/search",
+            json={"queries": ["clone", "readme"], "path_prefix": "app"},
+        )
+        assert response.status_code == 200
+        assert len(response.json()["results"]) == 2
+
+        response = client.post(
+            "/api/v1/repos/demo/search", json={"query": "a", "queries": ["b"]}
+        )
+        assert response.status_code == 400
+    finally:
+        main.app.dependency_overrides.clear()
@@ -0,0 +1,150 @@
+import io
+import threading
+
+import pytest
+from app.services.git_service import GitService
+from app.services.snapshot_service import SnapshotService
+from app.services.storage_service import StorageService
+from app.utils.index_archive import IndexArchiveError
+from app.utils.vector_store import open_vectorstore
+
+
+def make_node(tmp_path, monkeypatch, name):
+    """Create a SnapshotService backed by its own directories (a 'node')."""
+    monkeypatch.setenv("CHROMA_PERSIST_DIRECTORY", str(tmp_path / name / "chromadb"))
+    monkeypatch.setenv("ARCHIVE_DIRECTORY", str(tmp_path / name / "archives"))
+    git_service = GitService(max_repo_size_mb=500)
+    git_service.clone_dir_base = tmp_path / name / "repos"
+    return SnapshotService(storage_service=StorageService(git_service=git_service))
+
+
+# Fixture for a node holding a processed repository
+@pytest.fixture
+def source_node(tmp_path, monkeypatch):
+    node = make_node(tmp_path, monkeypatch, "source")
+    node.storage_service.register_clone(
+        "demo", "https://github.com/user/demo", "abc123"
+    )
+    collection = open_vectorstore("demo", node.chroma_persist_dir)._collection
+    collection.add(
+        ids=[f"chunk-{i}" for i in range(1200)],
+        documents=[f"def f{i}(): pass" for i in range(1200)],
+        metadatas=[{"file_path": f"src/f{i}.py"} for i in range(1200)],
+        embeddings=[[i / 10, -1.0, 0.25] for i in range(1200)],
+    )
+    return node
+
+
+# Test a snapshot exported on one node can be imported on another
+def test_export_and_import_round_trip(source_node, tmp_path, monkeypatch):
+    snapshot_path = tmp_path / "demo.scidx.gz"
+    exported = source_node.export_snapshot("demo", snapshot_path)
+
+    assert exported["chunk_count"] == 1200
+    assert exported["commit"] == "abc123"
+    assert exported["chunking"]["chunk_size"] == 2000
+
+    target = make_node(tmp_path, monkeypatch, "target")
+    with open(snapshot_path, "rb") as fh:
+        imported = target.import_snapshot(fh)
+
+    assert imported["repo_id"] == "demo"
+    assert imported["chunk_count"] == 1200
+    assert imported["format_version"] == 1
+
+    collection = open_vectorstore("demo", target.chroma_persist_dir)._collection
+    restored = collection.get(ids=["chunk-7"], include=["embeddings", "documents"])
+    assert restored["documents"] == ["def f7(): pass"]
+    assert restored["embeddings"][0].tolist() == pytest.approx([0.7, -1.0, 0.25])
+
+    # The working tree can be re-materialized from the recorded origin
+    entry = target.storage_service.get_entry("demo")
+    assert entry["repo_url"] == "https://github.com/user/demo"
+    assert entry["commit"] == "abc123"
+    assert entry["tree"] == "evicted"
+
+
+# Test importing replaces the existing index instead of duplicating it
+def test_import_replaces_existing_index(source_node, tmp_path):
+    snapshot_path = tmp_path / "demo.scidx.gz"
+    source_node.export_snapshot("demo", snapshot_path)
+
+    source_node.import_snapshot(snapshot_path, repo_id="demo")
+
+    collection = open_vectorstore("demo", source_node.chroma_persist_dir)._collection
+    assert collection.count() == 1200
+
+
+# Test snapshots built with another embedding model are rejected
+def test_import_rejects_other_embedding_model(source_node, tmp_path, monkeypatch):
+    snapshot_path = tmp_path / "demo.scidx.gz"
+    source_node.export_snapshot("demo", snapshot_path)
+
+    monkeypatch.setenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-large")
+    with pytest.raises(IndexArchiveError, match="embedding model"):
+        source_node.import_snapshot(snapshot_path)
+
+
+# Test exporting an unprocessed repository fails
+def test_export_unprocessed_repository(tmp_path, monkeypatch):
+    node = make_node(tmp_path, monkeypatch, "empty")
+    with pytest.raises(FileNotFoundError):
+        node.export_snapshot("missing", tmp_path / "missing.scidx.gz")
+
+
+# Test garbage input is rejected as an invalid archive
+def test_import_invalid_snapshot(tmp_path, monkeypatch):
+    node = make_node(tmp_path, monkeypatch, "target")
+    with pytest.raises(OSError):
+        node.import_snapshot(io.BytesIO(b"not a snapshot"))
+
+
+# Test a truncated snapshot leaves the existing index untouched
+def test_import_truncated_snapshot_keeps_existing_index(source_node, tmp_path):
+    snapshot_path = tmp_path / "demo.scidx.gz"
+    source_node.export_snapshot("demo", snapshot_path)
+    data = snapshot_path.read_bytes()
+
+    with pytest.raises((IndexArchiveError, EOFError)):
+        source_node.import_snapshot(io.BytesIO(data[: len(data) // 2]))
+
+    vectorstore = open_vectorstore("demo", source_node.chroma_persist_dir)
+    assert vectorstore._collection.count() == 1200
+    names = [c.name for c in vectorstore._client.list_collections()]
+    assert names == ["repo_demo"]
+
+
+# Test concurrent imports each stage separately and readers never see a gap
+def test_concurrent_imports_of_same_repository(source_node, tmp_path):
+    snapshot_path = tmp_path / "demo.scidx.gz"
+    source_node.export_snapshot("demo", snapshot_path)
+    errors, counts = [], []
+    done = threading.Event()
+
+    def run_import():
+        try:
+            source_node.import_snapshot(snapshot_path, repo_id="demo")
+        except Exception as e:
+            errors.append(e)
+
+    def read_status():
+        while not done.is_set():
+            vectorstore = open_vectorstore("demo", source_node.chroma_persist_dir)
+            counts.append(vectorstore._collection.count())
+
+    reader = threading.Thread(target=read_status)
+    reader.start()
+    imports = [threading.Thread(target=run_import) for _ in range(2)]
+    for thread in imports:
+        thread.start()
+    for thread in imports:
+        thread.join(30)
+    done.set()
+    reader.join(5)
+
+    assert errors == []
+    assert set(counts) == {1200}
+    vectorstore = open_vectorstore("demo", source_node.chroma_persist_dir)
+    assert vectorstore._collection.count() == 1200
+    names = [c.name for c in vectorstore._client.list_collections()]
+    assert names == ["repo_demo"]
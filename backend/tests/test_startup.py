@@ -0,0 +1,81 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import main
+import pytest
+from app.routers import api
+from fastapi.testclient import TestClient
+
+HEAVY_MODULES = ["langchain", "langchain_chroma", "langchain_openai", "chromadb"]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("WARMUP_ON_STARTUP", "false")
+    monkeypatch.setitem(main.warmup_state, "status", "starting")
+    monkeypatch.setitem(main.warmup_state, "error", None)
+    api.get_rag_service.cache_clear()
+    with TestClient(main.app) as client:
+        yield client
+    api.get_rag_service.cache_clear()
+
+
+# Test importing the app does not load the heavy RAG stacks
+def test_import_main_is_lazy():
+    code = (
+        "import sys, main; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(main.__file__).parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
+
+
+# Test liveness answers before the services are warmed up
+def test_health_and_not_ready_before_warmup(client):
+    assert client.get("/health").json() == {"status": "healthy"}
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+
+# Test readiness flips once warm-up succeeds
+def test_ready_after_warmup(client, mocker):
+    mocker.patch.object(main, "get_rag_service")
+    main.warm_up_services()
+
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+
+# Test warm-up errors are reported by the readiness endpoint
+def test_warmup_error_reported(client, mocker):
+    mocker.patch.object(
+        main, "get_rag_service", side_effect=ValueError("OpenAI API key not found")
+    )
+    main.warm_up_services()
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["error"] == "OpenAI API key not found"
+
+
+# Test readiness flips once a request built the services lazily
+def test_ready_after_lazy_build_without_warmup(client, monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("CHROMA_PERSIST_DIRECTORY", str(tmp_path / "chromadb"))
+    assert client.get("/ready").status_code == 503
+
+    api.get_rag_service()
+
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
@@ -0,0 +1,330 @@
+import threading
+import time
+
+import pytest
+from app.services.git_service import GitService
+from app.services.storage_service import StorageService
+from app.utils.index_archive import open_index_archive, write_index_archive
+from app.utils.vector_store import get_index_id, open_vectorstore
+
+
+# Fixture to initialize StorageService against temporary directories
+@pytest.fixture
+def storage_service(tmp_path, monkeypatch, mocker):
+    monkeypatch.setenv("CHROMA_PERSIST_DIRECTORY", str(tmp_path / "chromadb"))
+    monkeypatch.setenv("ARCHIVE_DIRECTORY", str(tmp_path / "archives"))
+    monkeypatch.setenv("STORAGE_BUDGET_MB", "1")
+    monkeypatch.setenv("STORAGE_MIN_IDLE_SECONDS", "0")
+
+    git_service = GitService(max_repo_size_mb=500)
+    git_service.clone_dir_base = tmp_path / "repos"
+
+    def fake_clone(repo_url, commit=None, repo_id=None):
+        repo_id = repo_id or repo_url.split("/")[-1]
+        (git_service.clone_dir_base / repo_id).mkdir(parents=True, exist_ok=True)
+        return repo_id
+
+    mocker.patch.object(git_service, "clone_repository", side_effect=fake_clone)
+    return StorageService(git_service=git_service)
+
+
+def make_tree(service, repo_id, size_kb):
+    repo_path = service.repos_dir / repo_id
+    repo_path.mkdir(parents=True, exist_ok=True)
+    (repo_path / "blob.txt").write_bytes(b"x" * size_kb * 1024)
+    service.register_clone(repo_id, f"https://github.com/user/{repo_id}", "abc123")
+
+
+def make_index(service, repo_id, count=3):
+    collection = open_vectorstore(repo_id, service.chroma_persist_dir)._collection
+    collection.add(
+        ids=[f"{repo_id}-{i}" for i in range(count)],
+        documents=[f"chunk {i}" for i in range(count)],
+        metadatas=[{"file_path": f"file_{i}.py"} for i in range(count)],
+        embeddings=[[float(i), 0.5, -1.25] for i in range(count)],
+    )
+    service.record_index(repo_id)
+
+
+# Test archive round trip preserves documents, metadata and embeddings
+def test_index_archive_round_trip(tmp_path):
+    records = [
+        (f"id-{i}", f"doc {i}", {"file_path": f"f{i}.py"}, [i, i + 0.5])
+        for i in range(5)
+    ]
+    path = tmp_path / "index.scidx.gz"
+
+    assert write_index_archive(path, {"repo_id": "demo"}, records) == 5
+
+    with open_index_archive(path) as reader:
+        assert reader.header["repo_id"] == "demo"
+        batches = list(reader.iter_batches(batch_size=2))
+
+    assert [len(ids) for ids, _, _, _ in batches] == [2, 2, 1]
+    assert batches[2][0] == ["id-4"]
+    assert batches[2][2] == [{"file_path": "f4.py"}]
+    assert batches[2][3].tolist() == [[4.0, 4.5]]
+
+
+# Test least recently used working trees are evicted before any index
+def test_enforce_budget_evicts_cold_trees_first(storage_service):
+    make_tree(storage_service, "old", 600)
+    time.sleep(0.01)
+    make_tree(storage_service, "new", 600)
+
+    actions = storage_service.enforce_budget()
+
+    assert actions == [{"repo_id": "old", "action": "evicted_tree"}]
+    assert not (storage_service.repos_dir / "old").exists()
+    assert (storage_service.repos_dir / "new").exists()
+
+
+# Test protected repositories are never evicted
+def test_enforce_budget_respects_protected(storage_service):
+    make_tree(storage_service, "old", 600)
+    time.sleep(0.01)
+    make_tree(storage_service, "new", 600)
+
+    actions = storage_service.enforce_budget(protect={"old"})
+
+    assert actions == [{"repo_id": "new", "action": "evicted_tree"}]
+
+
+# Test cold indexes are archived and restored transparently
+def test_archive_and_rehydrate_index(storage_service):
+    make_tree(storage_service, "repo", 1)
+    make_index(storage_service, "repo")
+    index_id = get_index_id(
+        open_vectorstore("repo", storage_service.chroma_persist_dir)._collection
+    )
+    storage_service.budget_bytes = 1
+
+    actions = storage_service.enforce_budget()
+
+    assert {"repo_id": "repo", "action": "archived_index"} in actions
+    assert storage_service.get_usage()["repositories"][0]["tier"] == "cold"
+
+    assert storage_service.ensure_index("repo") is True
+    collection = open_vectorstore(
+        "repo", storage_service.chroma_persist_dir
+    )._collection
+    restored = collection.get(ids=["repo-2"], include=["embeddings", "metadatas"])
+    assert restored["embeddings"][0].tolist() == [2.0, 0.5, -1.25]
+    assert restored["metadatas"][0] == {"file_path": "file_2.py"}
+
+    # The restored collection keeps its build identity
+    assert get_index_id(collection) == index_id
+
+    # A warm index needs no restore
+    assert storage_service.ensure_index("repo") is False
+
+
+# Test a failed restore leaves no partial collection and keeps the archive
+def test_failed_restore_keeps_archive(storage_service, mocker):
+    make_tree(storage_service, "repo", 1)
+    make_index(storage_service, "repo")
+    storage_service.budget_bytes = 1
+    storage_service.enforce_budget()
+
+    def load_partially(collection, reader):
+        ids, documents, metadatas, embeddings = next(reader.iter_batches(1))
+        collection.add(
+            ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings
+        )
+        raise EOFError("truncated archive")
+
+    mocker.patch(
+        "app.services.storage_service.load_archive_batches",
+        side_effect=load_partially,
+    )
+    with pytest.raises(EOFError):
+        storage_service.ensure_index("repo")
+
+    vectorstore = open_vectorstore("repo", storage_service.chroma_persist_dir)
+    assert vectorstore._collection.count() == 0
+    assert [c.name for c in vectorstore._client.list_collections()] == ["repo_repo"]
+    assert storage_service.get_entry("repo")["index"] == "archived"
+    assert storage_service._archive_path("repo").exists()
+
+
+# Test evicted working trees are re-cloned at the recorded commit
+def test_ensure_working_tree_reclones(storage_service):
+    make_tree(storage_service, "repo", 600)
+    storage_service.budget_bytes = 1
+    storage_service.enforce_budget()
+
+    assert storage_service.ensure_working_tree("repo") is True
+    storage_service.git_service.clone_repository.assert_called_once_with(
+        "https://github.com/user/repo", "abc123", repo_id="repo"
+    )
+    assert storage_service.ensure_working_tree("repo") is False
+
+
+# Test a repository tracked under another ID is re-cloned into its own tree
+def test_ensure_working_tree_uses_tracked_id(storage_service):
+    make_tree(storage_service, "demo", 1)
+    storage_service.record_index("alias", repo_url="https://github.com/user/demo")
+
+    assert storage_service.ensure_working_tree("alias") is True
+    storage_service.git_service.clone_repository.assert_called_once_with(
+        "https://github.com/user/demo", None, repo_id="alias"
+    )
+    assert (storage_service.repos_dir / "alias").exists()
+    assert (storage_service.repos_dir / "demo" / "blob.txt").exists()
+
+
+# Test a clone landing in another directory is reported as an error
+def test_ensure_working_tree_checks_cloned_id(storage_service):
+    storage_service.record_index("alias", repo_url="https://github.com/user/demo")
+    storage_service.git_service.clone_repository.side_effect = None
+    storage_service.git_service.clone_repository.return_value = "demo"
+
+    with pytest.raises(RuntimeError, match="instead of 'alias'"):
+        storage_service.ensure_working_tree("alias")
+    assert storage_service.get_entry("alias")["tree"] == "evicted"
+
+
+# Test clone errors raised while re-cloning keep their status code
+def test_reclone_errors_keep_status_code(storage_service, monkeypatch, mocker):
+    monkeypatch.setenv("WARMUP_ON_STARTUP", "false")
+    import main
+    from app.routers import api
+    from fastapi import HTTPException
+    from fastapi.testclient import TestClient
+
+    mocker.patch.object(
+        storage_service,
+        "ensure_working_tree",
+        side_effect=HTTPException(
+            status_code=400, detail="Repository exceeds size limit"
+        ),
+    )
+    main.app.dependency_overrides[api.get_rag_service] = lambda: mocker.Mock()
+    main.app.dependency_overrides[api.get_storage_service] = lambda: storage_service
+    try:
+        client = TestClient(main.app)
+        for path in ["/api/v1/repos/repo/process", "/api/v1/repos/repo/summaries"]:
+            response = client.post(path)
+            assert response.status_code == 400
+            assert response.json()["detail"] == "Repository exceeds size limit"
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+# Test status and listings report evicted and archived repositories
+def test_endpoints_report_storage_tiers(storage_service, monkeypatch, mocker):
+    monkeypatch.setenv("WARMUP_ON_STARTUP", "false")
+    monkeypatch.chdir(storage_service.repos_dir.parent)
+    import main
+    from app.routers import api
+    from fastapi.testclient import TestClient
+
+    make_tree(storage_service, "repo", 1)
+    make_index(storage_service, "repo")
+    storage_service.budget_bytes = 1
+    storage_service.enforce_budget()
+
+    rag_service = mocker.Mock()
+    main.app.dependency_overrides[api.get_rag_service] = lambda: rag_service
+    main.app.dependency_overrides[api.get_storage_service] = lambda: storage_service
+    try:
+        client = TestClient(main.app)
+
+        status = client.get("/api/v1/repos/repo/status").json()
+        assert status["processed"] is True
+        assert status["chunk_count"] == 3
+        assert status["tier"] == "cold"
+        assert status["repo_exists"] is False
+        rag_service.get_repository_status.assert_not_called()
+
+        assert client.get("/api/v1/repos").json() == [
+            {
+                "repo_id": "repo",
+                "path": "repos/repo",
+                "size_mb": 0,
+                "exists": False,
+                "tier": "cold",
+            }
+        ]
+        response = client.get("/api/v1/repos/repo")
+        assert response.status_code == 200
+        assert response.json()["tier"] == "cold"
+        assert client.get("/api/v1/repos/missing").status_code == 404
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+# Test removal drops the tree, collection and manifest entry
+def test_remove_repository(storage_service):
+    make_tree(storage_service, "repo", 1)
+    make_index(storage_service, "repo")
+
+    storage_service.remove("repo")
+
+    assert not (storage_service.repos_dir / "repo").exists()
+    assert not storage_service.is_tracked("repo")
+    collection = open_vectorstore(
+        "repo", storage_service.chroma_persist_dir
+    )._collection
+    assert collection.count() == 0
+
+
+# Test a slow re-clone does not block other repositories
+def test_reclone_does_not_block_other_repositories(storage_service):
+    make_tree(storage_service, "slow", 600)
+    make_tree(storage_service, "other", 1)
+    make_index(storage_service, "other")
+    storage_service.budget_bytes = 1
+    storage_service.enforce_budget()
+
+    cloning = threading.Event()
+    release = threading.Event()
+
+    def slow_clone(repo_url, commit=None, repo_id=None):
+        cloning.set()
+        release.wait(5)
+        (storage_service.repos_dir / "slow").mkdir(parents=True, exist_ok=True)
+        return "slow"
+
+    storage_service.git_service.clone_repository.side_effect = slow_clone
+    thread = threading.Thread(
+        target=storage_service.ensure_working_tree, args=("slow",)
+    )
+    thread.start()
+    assert cloning.wait(5)
+
+    try:
+        start = time.monotonic()
+        assert storage_service.ensure_index("other") is True
+        assert time.monotonic() - start < 2
+    finally:
+        release.set()
+        thread.join(5)
+
+    assert storage_service.get_entry("slow")["tree"] == "present"
+
+
+# Test serving a hot repository does not rewrite the manifest on every request
+def test_access_times_are_persisted_coarsely(storage_service, mocker):
+    make_tree(storage_service, "repo", 1)
+    make_index(storage_service, "repo")
+    storage_service.min_idle_seconds = 300
+    save = mocker.spy(storage_service, "_save_manifest")
+
+    for _ in range(5):
+        assert storage_service.ensure_working_tree("repo") is False
+        assert storage_service.ensure_index("repo") is False
+
+    assert save.call_count == 1
+    assert storage_service.get_entry("repo")["last_access"] > time.time() - 1
+
+
+# Test the index size is measured from the files on disk
+def test_record_index_measures_disk_usage(storage_service, mocker):
+    make_tree(storage_service, "repo", 1)
+    pages = mocker.patch("app.utils.vector_store.iter_collection_pages")
+
+    make_index(storage_service, "repo", count=50)
+
+    assert storage_service.get_entry("repo")["index_bytes"] > 50 * 3 * 4
+    pages.assert_not_called()
@@ -0,0 +1,227 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from app.services.summary_service import SummaryService, route_question
+
+
+class FakeLLM:
+    """Fake chat model recording prompts and peak concurrency."""
+
+    def __init__(self, delay=0.0):
+        self.prompts = []
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        first_line = prompt.splitlines()[0]
+        return SimpleNamespace(content=f"summary of: {first_line}")
+
+
+# Fixture for a small repository on disk
+@pytest.fixture
+def repo_path(tmp_path):
+    repo = tmp_path / "repos" / "demo"
+    (repo / "app" / "services").mkdir(parents=True)
+    (repo / "app" / "routers").mkdir(parents=True)
+    (repo / "main.py").write_text("app = create_app()")
+    (repo / "app" / "services" / "git.py").write_text("class Git: pass")
+    (repo / "app" / "services" / "rag.py").write_text("class Rag: pass")
+    (repo / "app" / "routers" / "api.py").write_text("router = Router()")
+    return repo
+
+
+@pytest.fixture
+def summary_service(tmp_path, monkeypatch):
+    monkeypatch.setenv("SUMMARY_CACHE_DIRECTORY", str(tmp_path / "summaries"))
+    monkeypatch.setenv("SUMMARY_MAX_CONCURRENCY", "2")
+    return SummaryService(FakeLLM(delay=0.01))
+
+
+# Test summaries are built bottom-up for files, directories and the root
+def test_build_summaries_hierarchy(summary_service, repo_path):
+    result = summary_service.build_summaries("demo", repo_path)
+
+    assert result["status"] == "summarized"
+    assert result["file_count"] == 4
+    assert result["directory_count"] == 4  # ., app, app/services, app/routers
+    assert result["computed"] == 8
+
+    nodes = summary_service.load_summaries("demo")
+    assert nodes["app"]["children"] == ["app/routers", "app/services"]
+    assert nodes["."]["children"] == ["app", "main.py"]
+
+    prompts = summary_service.llm.prompts
+    # Every directory is summarized after its children
+    assert prompts.index(next(p for p in prompts if "`app/services`" in p)) < (
+        prompts.index(next(p for p in prompts if "directory `app` " in p))
+    )
+    assert prompts[-1].startswith("Write an overview")
+    assert "summary of: Summarize the directory `app`" in prompts[-1]
+
+
+# Test LLM concurrency is bounded
+def test_build_summaries_bounded_concurrency(summary_service, repo_path):
+    summary_service.build_summaries("demo", repo_path)
+
+    assert summary_service.llm.peak <= 2
+
+
+# Test unchanged repositories reuse every cached summary
+def test_rebuild_reuses_cache(summary_service, repo_path):
+    summary_service.build_summaries("demo", repo_path)
+    summary_service.llm.prompts.clear()
+
+    result = summary_service.build_summaries("demo", repo_path)
+
+    assert result["computed"] == 0
+    assert summary_service.llm.prompts == []
+
+
+# Test only the changed file and its ancestors are recomputed
+def test_rebuild_recomputes_changed_subtree(summary_service, repo_path):
+    summary_service.build_summaries("demo", repo_path)
+    summary_service.llm.prompts.clear()
+
+    (repo_path / "app" / "services" / "rag.py").write_text("class Rag:\n    v = 2")
+    result = summary_service.build_summaries("demo", repo_path)
+
+    # rag.py, app/services, app and the root overview
+    assert result["computed"] == 4
+    recomputed = [p.splitlines()[0] for p in summary_service.llm.prompts]
+    assert not any("api.py" in p or "app/routers" in p for p in recomputed)
+
+
+# Test summaries finished before a failure are kept for the next build
+def test_failed_build_keeps_completed_summaries(summary_service, repo_path):
+    llm = summary_service.llm
+    invoke = llm.invoke
+
+    def flaky_invoke(prompt):
+        if "`app/routers/api.py`" in prompt:
+            raise RuntimeError("rate limited")
+        return invoke(prompt)
+
+    llm.invoke = flaky_invoke
+    with pytest.raises(RuntimeError):
+        summary_service.build_summaries("demo", repo_path)
+
+    saved = summary_service.load_summaries("demo")
+    assert set(saved) == {"main.py", "app/services/git.py", "app/services/rag.py"}
+
+    llm.invoke = invoke
+    llm.prompts.clear()
+    result = summary_service.build_summaries("demo", repo_path)
+    assert result["reused"] == 3
+
+
+# Test the summary context starts with the overview and respects the budget
+def test_summary_context_is_coarsest_first(summary_service, repo_path):
+    summary_service.build_summaries("demo", repo_path)
+
+    context = summary_service.get_summary_context("demo")
+    assert [item["path"] for item in context[:2]] == [".", "app"]
+    assert context[-1]["kind"] == "file"
+
+    summary_service.max_context_chars = 1
+    assert [item["path"] for item in summary_service.get_summary_context("demo")] == [
+        "."
+    ]
+
+
+# Test broad questions are routed to summaries only when they exist
+@pytest.mark.parametrize(
+    "question, has_summaries, expected",
+    [
+        ("How is this project structured?", True, "summary"),
+        ("Give me a high-level overview", True, "summary"),
+        ("What does this repository do?", True, "summary"),
+        ("How is this project structured?", False, "chunks"),
+        ("Where is clone_repository defined?", True, "chunks"),
+        ("Why does get_code_files skip node_modules?", True, "chunks"),
+        ("How is the code structured?", True, "summary"),
+        ("What is the structure of this repository?", True, "summary"),
+        ("What data structure does the LRU cache in metrics.py use?", True, "chunks"),
+        ("How is the CSS layout of the sidebar computed?", True, "chunks"),
+        ("What data structure does the LRU cache use?", True, "chunks"),
+        ("What is the structure of the ChatResponse model?", True, "chunks"),
+        ("Give me an overview of app/services/git_service.py", True, "chunks"),
+        ("What is the architecture of `SummaryService`?", True, "chunks"),
+    ],
+)
+def test_route_question(question, has_summaries, expected):
+    assert route_question(question, has_summaries) == expected
+
+
+def make_rag_service(summary_service, tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("CHROMA_PERSIST_DIRECTORY", str(tmp_path / "chromadb"))
+    from app.services.rag_service import RAGService
+
+    rag_service = RAGService()
+    rag_service.llm = FakeLLM()
+    rag_service.summary_service = summary_service
+    return rag_service
+
+
+# Test broad chat questions are answered from summaries in one LLM call
+def test_chat_answers_broad_question_from_summaries(
+    summary_service, repo_path, tmp_path, monkeypatch
+):
+    rag_service = make_rag_service(summary_service, tmp_path, monkeypatch)
+    summary_service.build_summaries(
+        "demo", repo_path, index_id=rag_service._index_id("demo")
+    )
+
+    result = rag_service.chat_with_repository("demo", "What is the architecture?")
+
+    assert result["route"] == "summary"
+    assert result["sources"][0]["file_path"] == "."
+    assert len(rag_service.llm.prompts) == 1
+    assert "Question: What is the architecture?" in rag_service.llm.prompts[0]
+
+
+# Test narrow questions are routed to chunks without loading the summaries
+def test_chat_narrow_question_skips_summary_lookup(
+    summary_service, tmp_path, monkeypatch, mocker
+):
+    rag_service = make_rag_service(summary_service, tmp_path, monkeypatch)
+    has_summaries = mocker.spy(rag_service, "has_current_summaries")
+    mocker.patch(
+        "app.services.rag_service.open_vectorstore",
+        side_effect=RuntimeError("no index"),
+    )
+
+    with pytest.raises(Exception, match="no index"):
+        rag_service.chat_with_repository("demo", "Where is clone_repository defined?")
+
+    has_summaries.assert_not_called()
+
+
+# Test summaries built against a replaced index are not used
+def test_summaries_ignored_after_index_replaced(
+    summary_service, repo_path, tmp_path, monkeypatch
+):
+    from app.utils.vector_store import replace_collection
+
+    rag_service = make_rag_service(summary_service, tmp_path, monkeypatch)
+    summary_service.build_summaries(
+        "demo", repo_path, index_id=rag_service._index_id("demo")
+    )
+    assert rag_service.has_current_summaries("demo")
+
+    # Reprocessing and snapshot imports swap in a new collection
+    replace_collection("demo", rag_service.chroma_persist_dir, lambda staging: None)
+
+    assert not rag_service.has_current_summaries("demo")
+    assert summary_service.has_summaries("demo")
@@ -1,10 +1,13 @@
 // src/types/index.ts
+export type StorageTier = 'hot' | 'warm' | 'cold';
+
 export interface Repository {
   repo_id: string;
   path: string;
   size_mb: number;
   file_count?: number;
   exists?: boolean;
+  tier?: StorageTier;
 }
 
 export interface CloneResponse {
@@ -51,6 +54,7 @@ export interface RepositoryStatus {
   repo_exists: boolean;
   repo_size_mb?: number;
   total_files?: number;
+  tier?: StorageTier;
 }
 
 export interface ApiError {